@@ -1,10 +1,18 @@
+import json
+import logging
 import os
+
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file if it exists
 # Useful for local development without setting system-wide env vars
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes")
+
 # VAST DB Connection Details
 # These credentials are used by the server's lifespan manager to establish the primary
 # connection to the VAST DB at application startup.
@@ -25,6 +33,96 @@ ALLOWED_SQL_TYPES = [stmt_type.strip().upper() for stmt_type in _allowed_types_s
 # Default Rate Limit (slowapi format string)
 DEFAULT_RATE_LIMIT = os.getenv("MCP_DEFAULT_RATE_LIMIT", "10/minute")
 
+# Number of distinct SQL texts whose statement-type classification is remembered
+SQL_PARSE_CACHE_SIZE = int(os.getenv("MCP_SQL_PARSE_CACHE_SIZE", "1024"))
+
+# Maximum number of table samples fetched concurrently by
+# db_ops.prefetch_tables_with_samples
+SAMPLE_PREFETCH_CONCURRENCY = int(os.getenv("MCP_SAMPLE_PREFETCH_CONCURRENCY", "4"))
+
+# Maximum number of VAST DB sessions kept open for concurrent requests, and the seconds
+# an unused session may sit idle before it is closed (0 keeps idle sessions open).
+DB_POOL_SIZE = int(os.getenv("MCP_DB_POOL_SIZE", "4"))
+DB_POOL_IDLE_TTL = float(os.getenv("MCP_DB_POOL_IDLE_TTL", "300"))
+# Seconds between background health checks of idle pooled sessions (each session idle at
+# least that long gets a SELECT 1; dropped ones are replaced). 0 disables the heartbeat.
+DB_POOL_HEARTBEAT = float(os.getenv("MCP_DB_POOL_HEARTBEAT", "60"))
+# Seconds a session may sit idle before checkout health-checks it (0 never checks).
+DB_POOL_STALE_AFTER = float(os.getenv("MCP_DB_POOL_STALE_AFTER", "0"))
+
+# Number of worker threads db_ops uses for blocking VAST DB calls. Defaults to the
+# session pool size, so a free session never waits for a thread (and no thread waits
+# for a session). Requests beyond this queue instead of spawning more threads. Each
+# open result stream (STREAM_RESULTS) holds a thread until its consumer finishes
+# reading, so this is also the number of streams that can be read at once before other
+# requests start waiting.
+DB_THREAD_POOL_SIZE = int(os.getenv("MCP_DB_THREAD_POOL_SIZE") or DB_POOL_SIZE)
+
+# Seconds that db_ops keeps a fetched schema / table metadata before reading it again.
+# DDL run through this server invalidates the cache immediately; 0 disables caching.
+SCHEMA_CACHE_TTL = float(os.getenv("MCP_SCHEMA_CACHE_TTL", "300"))
+# Seconds the SHOW TABLES list is reused (capped by MCP_SCHEMA_CACHE_TTL). Kept shorter
+# because tables created by other clients should show up quickly.
+TABLE_LIST_TTL = float(os.getenv("MCP_TABLE_LIST_TTL", "60"))
+# Fetch the schema in the background at startup so the first request for it hits the
+# cache (has no effect when MCP_SCHEMA_CACHE_TTL is 0).
+SCHEMA_WARMUP = _env_flag("MCP_SCHEMA_WARMUP", "true")
+
+# Read the schema with one information_schema.columns query instead of SHOW TABLES plus
+# a DESCRIBE per table. Servers without the catalog fall back automatically; turn this
+# off if the catalog is restricted or reports tables differently from DESCRIBE.
+USE_INFO_SCHEMA = _env_flag("MCP_USE_INFO_SCHEMA", "true")
+
+# Tables described at once when the schema falls back to one DESCRIBE TABLE per table
+# (each uses its own pooled session, so MCP_DB_POOL_SIZE also caps it).
+SCHEMA_DESCRIBE_CONCURRENCY = int(os.getenv("MCP_SCHEMA_DESCRIBE_CONCURRENCY", "4"))
+
+# Seconds that table samples and SELECT results are reused for identical requests
+# (0, the default, disables result caching). Writes run through this server invalidate
+# the cache immediately; writes by other clients can go unnoticed for up to the TTL.
+RESULT_CACHE_TTL = float(os.getenv("MCP_RESULT_CACHE_TTL", "0"))
+# Results kept per session, and the largest result (in rows) worth keeping.
+RESULT_CACHE_SIZE = int(os.getenv("MCP_RESULT_CACHE_SIZE", "128"))
+RESULT_CACHE_MAX_ROWS = int(os.getenv("MCP_RESULT_CACHE_MAX_ROWS", "10000"))
+
+# Aggregate queries to precompute in the background, as a JSON object of name -> SELECT,
+# e.g. '{"order_count": "SELECT COUNT(*) FROM orders"}'. vast_sql_query answers the
+# identical SQL from the latest result. Refreshed every METRIC_REFRESH_SECONDS. A
+# malformed value is logged and ignored rather than stopping the server from importing.
+def _load_metrics(raw: str) -> dict:
+    try:
+        metrics = json.loads(raw or "{}")
+    except ValueError as e:
+        logger.error("Ignoring MCP_PRECOMPUTED_METRICS: not valid JSON (%s).", e)
+        return {}
+    if not isinstance(metrics, dict) or not all(
+        isinstance(v, str) for v in metrics.values()
+    ):
+        logger.error(
+            "Ignoring MCP_PRECOMPUTED_METRICS: "
+            "expected a JSON object of name -> SELECT."
+        )
+        return {}
+    return metrics
+
+PRECOMPUTED_METRICS = _load_metrics(os.getenv("MCP_PRECOMPUTED_METRICS", ""))
+METRIC_REFRESH_SECONDS = float(os.getenv("MCP_METRIC_REFRESH_SECONDS", "300"))
+# Oldest precomputed result (in seconds) still served; older ones are ignored and the
+# query runs normally. This bounds how long writes by other clients can go unnoticed.
+# Defaults to twice METRIC_REFRESH_SECONDS, so one slow or failed refresh does not
+# disable the metric.
+METRIC_MAX_AGE_SECONDS = float(
+    os.getenv("MCP_METRIC_MAX_AGE_SECONDS") or 2 * METRIC_REFRESH_SECONDS
+)
+
+# When enabled, vast_sql_query and the table sample resource read results in batches and
+# format each batch as it arrives instead of materialising every row first. Worth
+# enabling for large result sets. Streamed queries always run: they skip the result
+# cache, precomputed metrics and the sharing of identical in-flight SELECTs.
+STREAM_RESULTS = _env_flag("MCP_STREAM_RESULTS", "false")
+# Rows pulled from the database per round trip (cursor.fetchmany) while streaming.
+FETCH_BATCH_SIZE = int(os.getenv("MCP_FETCH_BATCH_SIZE", "2048"))
+
 # --- Optional Configuration ---
 # Add other configuration variables as needed, e.g.:
 # DEFAULT_QUERY_LIMIT = 100
@@ -1,17 +1,42 @@
+import asyncio
+import functools
 import logging
 from dataclasses import dataclass
-from typing import AsyncIterator
+from typing import AsyncIterator, Callable, Union
 
 import vastdb # Assuming vastdb.api.VastSession is the correct type
 from mcp_server.fastmcp import FastMCP # For type hinting server, adjust if path is different
 
 from . import config # For VAST_DB_ENDPOINT, VAST_ACCESS_KEY, VAST_SECRET_KEY
+from .vast_integration import db_ops
+from .vast_integration.pool import SessionPool
 
 logger = logging.getLogger(__name__)
 
 @dataclass
 class LifespanAppContext:
-    db_connection: vastdb.api.VastSession # Adjust if vastdb.api.VastSession is not the actual type
+    # A pool of VAST DB sessions (db_ops also accepts one vastdb.api.VastSession).
+    db_connection: Union[SessionPool, vastdb.api.VastSession]
+
+def _session_factory() -> Callable[[], vastdb.api.VastSession]:
+    """Returns a callable opening a VAST DB session with the configured credentials.
+
+    The endpoint and credentials are read and checked once, here, rather than every time
+    the pool opens a session.
+
+    Raises:
+        ValueError: If the endpoint, access key or secret key is not configured.
+    """
+    endpoint = config.VAST_DB_ENDPOINT
+    access_key = config.VAST_ACCESS_KEY
+    secret_key = config.VAST_SECRET_KEY
+    if not (endpoint and access_key and secret_key):
+        raise ValueError(
+            "VAST_DB_ENDPOINT, VAST_ACCESS_KEY and VAST_SECRET_KEY must all be set."
+        )
+    return functools.partial(
+        vastdb.connect, endpoint=endpoint, access_key=access_key, secret_key=secret_key
+    )
 
 async def app_lifespan(server: FastMCP) -> AsyncIterator[LifespanAppContext]:
     """
@@ -23,33 +48,58 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[LifespanAppContext]:
     VAST DB connection pool. The yielded context (`LifespanAppContext`)
     is made available to request handlers.
     """
-    conn = None
-    logger.info("Initializing VAST DB connection...")
+    pool = None
+    metric_refresher = None
+    schema_warmup = None
+    heartbeat = None
+    logger.info(
+        "Initializing VAST DB connection pool (max %d sessions)...", config.DB_POOL_SIZE
+    )
     try:
-        # Create the VAST DB connection.
-        # vastdb.connect() is synchronous, but it's called only once at startup,
-        # so its impact on the event loop during application initialization is acceptable.
-        conn = vastdb.connect(
-            endpoint=config.VAST_DB_ENDPOINT,
-            access_key=config.VAST_ACCESS_KEY,
-            secret_key=config.VAST_SECRET_KEY
+        pool = SessionPool(
+            _session_factory(),
+            max_size=config.DB_POOL_SIZE,
+            idle_ttl=config.DB_POOL_IDLE_TTL,
+            stale_after=config.DB_POOL_STALE_AFTER,
         )
+        # Open the first session now so a bad endpoint or credentials fail at startup.
+        # vastdb.connect() is synchronous, but this runs only once during
+        # initialization, so its impact on the event loop is acceptable. Further
+        # sessions open on demand.
+        pool.warm()
         logger.info("VAST DB connection established.")
-        yield LifespanAppContext(db_connection=conn)
+        if config.DB_POOL_HEARTBEAT > 0:
+            heartbeat = asyncio.create_task(
+                db_ops.run_pool_heartbeat(pool, config.DB_POOL_HEARTBEAT)
+            )
+        if config.SCHEMA_WARMUP and config.SCHEMA_CACHE_TTL > 0:
+            # Agents usually ask for the schema first; fetch it during startup.
+            schema_warmup = asyncio.create_task(db_ops.warm_schema_cache(pool))
+        # Invalid metrics are logged and skipped; they never stop the server.
+        if db_ops.register_metrics(config.PRECOMPUTED_METRICS):
+            metric_refresher = asyncio.create_task(
+                db_ops.run_metric_refresher(pool, config.METRIC_REFRESH_SECONDS)
+            )
+        yield LifespanAppContext(db_connection=pool)
     except Exception as e:
         logger.error("Failed to initialize VAST DB connection: %s", e, exc_info=True)
         # Optionally re-raise or handle to prevent server startup if DB is critical
         raise
     finally:
-        if conn:
-            logger.info("Closing VAST DB connection...")
+        if heartbeat is not None:
+            heartbeat.cancel()
+        if schema_warmup is not None:
+            schema_warmup.cancel()
+        if metric_refresher is not None:
+            metric_refresher.cancel()
+        if pool is not None:
+            logger.info("Closing VAST DB connection pool...")
             try:
-                if hasattr(conn, 'close') and callable(conn.close):
-                    conn.close() # Assuming close is synchronous
-                    logger.info("VAST DB connection closed.")
-                else:
-                    logger.warning("VAST DB connection object does not have a callable 'close' method.")
+                pool.close()
+                logger.info("VAST DB connection pool closed.")
             except Exception as e:
-                logger.error("Error closing VAST DB connection: %s", e, exc_info=True)
+                logger.error(
+                    "Error closing VAST DB connection pool: %s", e, exc_info=True
+                )
         else:
             logger.info("No VAST DB connection to close (was not established).")
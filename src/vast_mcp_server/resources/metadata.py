@@ -54,7 +54,7 @@ async def get_table_metadata_resource(request: Request, table_name: str, headers
 
     # Retrieve the shared VAST DB connection from the application context.
     db_connection = ctx.request_context.lifespan_context.db_connection
-    if not db_connection:
+    if db_connection is None:
         logger.error("Database connection not found in context for table metadata request: %s", table_name)
         return McpResponse(
             status_code=StatusCode.INTERNAL_SERVER_ERROR,
@@ -69,7 +69,7 @@ async def get_table_metadata_resource(request: Request, table_name: str, headers
     try:
         # Pass the connection from context, no longer individual keys
         metadata = await db_ops.get_table_metadata(db_connection, table_name)
-        response_body = json.dumps(metadata, indent=2)
+        response_body = utils.dumps_json(metadata)
         return McpResponse(
             status_code=StatusCode.OK,
             headers={"Content-Type": "application/json"},
@@ -103,7 +103,12 @@ async def get_table_metadata_resource(request: Request, table_name: str, headers
             body=json.dumps({"error": error_message, "details": str(e)}).encode('utf-8')
         )
     except DatabaseConnectionError as e:
-        logger.error("Database connection error during metadata fetch for table '%s': %s", table_name, e, exc_info=True)
+        logger.error(
+            "Database connection error during metadata fetch for table '%s': %s",
+            table_name,
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         if "authentication failed" in str(e).lower() or "invalid credentials" in str(e).lower():
             status_code = StatusCode.UNAUTHENTICATED
             error_body = {"error": "Authentication failed with provided credentials.", "details": str(e)}
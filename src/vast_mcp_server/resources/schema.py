@@ -48,7 +48,7 @@ async def get_vast_schema(request: Request, headers: dict, ctx: Context) -> McpR
 
     # Retrieve the shared VAST DB connection from the application context.
     db_connection = ctx.request_context.lifespan_context.db_connection
-    if not db_connection:
+    if db_connection is None:
         logger.error("Database connection not found in context for schema request.")
         return McpResponse(
             status_code=StatusCode.INTERNAL_SERVER_ERROR,
@@ -65,7 +65,11 @@ async def get_vast_schema(request: Request, headers: dict, ctx: Context) -> McpR
             body=schema_info.encode('utf-8')
         )
     except DatabaseConnectionError as e:
-        logger.error("Database connection error for vast://schemas: %s", e, exc_info=True)
+        logger.error(
+            "Database connection error for vast://schemas: %s",
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         if "authentication failed" in str(e).lower() or "invalid credentials" in str(e).lower():
             status_code = StatusCode.UNAUTHENTICATED
             error_message = "Database authentication failed."
@@ -78,14 +82,22 @@ async def get_vast_schema(request: Request, headers: dict, ctx: Context) -> McpR
             body=json.dumps({"error": error_message, "details": str(e)}).encode('utf-8')
         )
     except SchemaFetchError as e: # More specific VAST MCP error
-        logger.error("Schema fetch error for vast://schemas: %s", e, exc_info=True)
+        logger.error(
+            "Schema fetch error for vast://schemas: %s",
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         return McpResponse(
             status_code=StatusCode.INTERNAL_SERVER_ERROR, # Or other appropriate code
             headers={"Content-Type": "application/json"},
             body=json.dumps({"error": "Failed to fetch schema", "details": str(e)}).encode('utf-8')
         )
     except VastMcpError as e: # Catch other VastMcpErrors
-        logger.error("VastMcpError handling vast://schemas request: %s", e, exc_info=True)
+        logger.error(
+            "VastMcpError handling vast://schemas request: %s",
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         return McpResponse(
             status_code=StatusCode.INTERNAL_SERVER_ERROR, # Generic for other VAST errors
             headers={"Content-Type": "application/json"},
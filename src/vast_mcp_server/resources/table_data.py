@@ -18,7 +18,9 @@ logger = logging.getLogger(__name__)
 
 @mcp_app.resource("vast://tables")
 @limiter.limit(config.DEFAULT_RATE_LIMIT)
-async def list_vast_tables(request: Request, format: str = "json", headers: dict, ctx: Context) -> McpResponse:
+async def list_vast_tables(
+    request: Request, headers: dict, ctx: Context, format: str = "json"
+) -> McpResponse:
     """Provides a list of available tables in the VAST DB.
 
     Authentication is performed by comparing X-Vast-Access-Key and X-Vast-Secret-Key
@@ -26,10 +28,10 @@ async def list_vast_tables(request: Request, format: str = "json", headers: dict
 
     Args:
         request: The Starlette Request object.
-        format: The desired output format ("json", "csv", "list"). Defaults to "json".
-                "list" is treated as "csv".
         headers: Request headers containing authentication credentials.
         ctx: The MCP Context, used to access shared resources like the DB connection.
+        format: The desired output format ("json", "csv", "list"). Defaults to "json".
+                "list" is treated as "csv".
 
     Returns:
         An McpResponse containing the list of table names or an error.
@@ -59,7 +61,7 @@ async def list_vast_tables(request: Request, format: str = "json", headers: dict
 
     # Retrieve the shared VAST DB connection from the application context.
     db_connection = ctx.request_context.lifespan_context.db_connection
-    if not db_connection:
+    if db_connection is None:
         logger.error("Database connection not found in context for list_vast_tables.")
         return McpResponse(
             status_code=StatusCode.INTERNAL_SERVER_ERROR,
@@ -80,7 +82,11 @@ async def list_vast_tables(request: Request, format: str = "json", headers: dict
             body=body_content.encode('utf-8')
         )
     except DatabaseConnectionError as e: # This might still occur if the connection passed from context is bad
-        logger.error("Database connection error for vast://tables: %s", e, exc_info=True)
+        logger.error(
+            "Database connection error for vast://tables: %s",
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         # The nature of the error might change as we are not establishing connection here.
         # For instance, "authentication failed" might be less likely if initial conn succeeded.
         # However, connection could drop or have other issues.
@@ -90,7 +96,11 @@ async def list_vast_tables(request: Request, format: str = "json", headers: dict
             body=json.dumps({"error": "Database operation failed due to connection issue", "details": str(e)}).encode('utf-8')
         )
     except VastMcpError as e: # Catch other VAST specific errors
-        logger.error("VastMcpError handling vast://tables: %s", e, exc_info=True)
+        logger.error(
+            "VastMcpError handling vast://tables: %s",
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         return McpResponse(
             status_code=StatusCode.INTERNAL_SERVER_ERROR,
             headers={"Content-Type": "application/json"},
@@ -116,7 +126,9 @@ async def get_vast_table_sample(request: Request, table_name: str, limit: Option
         request: The Starlette Request object.
         table_name: The name of the table to sample.
         limit: The maximum number of rows to return. Defaults to 10.
-        format: The desired output format ("csv" or "json"). Defaults to "csv".
+        format: The desired output format ("csv", "json", "columnar" or "arrow").
+                Defaults to "csv". "arrow" returns an Arrow IPC stream (requires pyarrow
+                on the server).
         headers: Request headers containing authentication credentials.
         ctx: The MCP Context, used to access shared resources like the DB connection.
 
@@ -124,7 +136,11 @@ async def get_vast_table_sample(request: Request, table_name: str, limit: Option
         An McpResponse containing the table sample data or an error.
     """
     effective_limit = limit if limit is not None and limit > 0 else 10
-    format_type = format.lower() if format.lower() in ["csv", "json"] else "csv"
+    format_type = (
+        format.lower()
+        if format.lower() in ["csv", "json", "columnar", "arrow"]
+        else "csv"
+    )
     logger.info(
         "MCP Resource request: vast://tables/%s?limit=%s&format=%s (effective_limit=%d) from %s",
         table_name, str(limit), format_type, effective_limit, request.client.host
@@ -152,7 +168,7 @@ async def get_vast_table_sample(request: Request, table_name: str, limit: Option
 
     # Retrieve the shared VAST DB connection from the application context.
     db_connection = ctx.request_context.lifespan_context.db_connection
-    if not db_connection:
+    if db_connection is None:
         logger.error("Database connection not found in context for get_vast_table_sample: %s", table_name)
         return McpResponse(
             status_code=StatusCode.INTERNAL_SERVER_ERROR,
@@ -161,6 +177,41 @@ async def get_vast_table_sample(request: Request, table_name: str, limit: Option
         )
 
     try:
+        if format_type == "arrow":
+            # Columnar end to end: no Python row objects are built for Arrow clients
+            arrow_table = await db_ops.get_table_sample_arrow(
+                db_connection, table_name, effective_limit
+            )
+            return McpResponse(
+                status_code=StatusCode.OK,
+                headers={"Content-Type": "application/vnd.apache.arrow.stream"},
+                body=utils.format_arrow_payload(arrow_table)
+            )
+
+        if config.STREAM_RESULTS:
+            # Rows are encoded batch by batch, so a large sample is never held twice.
+            body_content = await utils.format_stream_payload(
+                db_ops.stream_table_sample(db_connection, table_name, effective_limit),
+                format_type,
+            )
+            if body_content is None:
+                body_content = (
+                    f"-- No data found in table '{table_name}' "
+                    "or table does not exist. --"
+                )
+                content_type = "text/plain; charset=utf-8"
+            else:
+                content_type = (
+                    "text/csv; charset=utf-8"
+                    if format_type == "csv"
+                    else "application/json"
+                )
+            return McpResponse(
+                status_code=StatusCode.OK,
+                headers={"Content-Type": content_type},
+                body=body_content.encode('utf-8')
+            )
+
         result_data = await db_ops.get_table_sample(db_connection, table_name, effective_limit)
 
         if isinstance(result_data, str): # E.g., "-- No data found --"
@@ -170,10 +221,14 @@ async def get_vast_table_sample(request: Request, table_name: str, limit: Option
                 headers={"Content-Type": "text/plain; charset=utf-8"},
                 body=result_data.encode('utf-8')
             )
-        elif isinstance(result_data, list):
+        elif isinstance(result_data, (dict, list)):
             logger.debug("Formatting successful table sample for '%s' as %s.", table_name, format_type)
             body_content = utils.format_data_payload(result_data, format_type)
-            content_type = "application/json" if format_type == "json" else "text/csv; charset=utf-8"
+            content_type = (
+                "text/csv; charset=utf-8"
+                if format_type == "csv"
+                else "application/json"
+            )
             return McpResponse(
                 status_code=StatusCode.OK,
                 headers={"Content-Type": content_type},
@@ -196,7 +251,12 @@ async def get_vast_table_sample(request: Request, table_name: str, limit: Option
             body=json.dumps({"error": "Invalid input", "details": str(e)}).encode('utf-8')
         )
     except DatabaseConnectionError as e: # Still possible if connection from context is bad
-        logger.error("Database connection error for vast://tables/%s: %s", table_name, e, exc_info=True)
+        logger.error(
+            "Database connection error for vast://tables/%s: %s",
+            table_name,
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         return McpResponse(
             status_code=StatusCode.SERVICE_UNAVAILABLE,
             headers={"Content-Type": "application/json"},
@@ -217,7 +277,12 @@ async def get_vast_table_sample(request: Request, table_name: str, limit: Option
             body=json.dumps({"error": error_msg, "details": str(e)}).encode('utf-8')
         )
     except VastMcpError as e: # Catch other VAST specific errors
-        logger.error("VastMcpError handling vast://tables/%s: %s", table_name, e, exc_info=True)
+        logger.error(
+            "VastMcpError handling vast://tables/%s: %s",
+            table_name,
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         return McpResponse(
             status_code=StatusCode.INTERNAL_SERVER_ERROR,
             headers={"Content-Type": "application/json"},
@@ -27,7 +27,7 @@ async def vast_sql_query(request: Request, sql: str, format: str, headers: dict,
     Args:
         request: The Starlette Request object.
         sql: The SQL query to execute.
-        format: The desired output format ('csv' or 'json').
+        format: The desired output format ('csv', 'json' or 'columnar').
         headers: Request headers containing authentication credentials.
         ctx: The MCP Context, used to access the shared DB connection from the lifespan manager.
 
@@ -35,7 +35,9 @@ async def vast_sql_query(request: Request, sql: str, format: str, headers: dict,
         A string containing the query results or an error message, formatted as requested.
     """
     sql_snippet = sql[:200] + ("..." if len(sql) > 200 else "")
-    format_type = format.lower() if format.lower() in ["csv", "json"] else "csv"
+    format_type = (
+        format.lower() if format.lower() in ["csv", "json", "columnar"] else "csv"
+    )
     logger.info(
         "MCP Tool request: vast_sql_query(format='%s', sql='%s') from %s",
         format_type, sql_snippet, request.client.host
@@ -53,20 +55,30 @@ async def vast_sql_query(request: Request, sql: str, format: str, headers: dict,
 
     # Retrieve the shared VAST DB connection from the application context.
     db_connection = ctx.request_context.lifespan_context.db_connection
-    if not db_connection:
+    if db_connection is None:
         logger.error("Database connection not found in context for vast_sql_query.")
         conn_error = DatabaseConnectionError("Database connection unavailable.")
         return utils.format_tool_error_response_body(conn_error, format_type)
 
     try:
+        if config.STREAM_RESULTS:
+            # Rows are encoded per batch, so the full result set is never held at once.
+            payload = await utils.format_stream_payload(
+                db_ops.stream_sql_query(db_connection, sql), format_type
+            )
+            if payload is None:
+                logger.info("Streamed SQL query returned no rows.")
+                return "-- Query executed successfully, but returned no rows. --"
+            return payload
+
         result_data = await db_ops.execute_sql_query(db_connection, sql)
 
         if isinstance(result_data, str):
             # It's an informational message (e.g., "-- No data found --")
             logger.info("Received message from db_ops for SQL query: %s", result_data)
             return result_data
-        elif isinstance(result_data, list):
-            # Format the list of dicts
+        elif isinstance(result_data, (dict, list)):
+            # Format the columnar result (or a list of row dicts)
             logger.debug("Formatting successful SQL query result as %s.", format_type)
             return utils.format_data_payload(result_data, format_type)
         else:
@@ -80,7 +92,12 @@ async def vast_sql_query(request: Request, sql: str, format: str, headers: dict,
         logger.warning("Invalid input for vast_sql_query: %s", e)
         return utils.format_tool_error_response_body(e, format_type)
     except VastMcpError as e:
-        logger.error("Database error handling vast_sql_query: %s", e, exc_info=True)
+        # db_ops already logged the failure; only include the traceback when debugging.
+        logger.error(
+            "Database error handling vast_sql_query: %s",
+            e,
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
         return utils.format_tool_error_response_body(e, format_type)
     except Exception as e:
         # Catch any other unexpected errors
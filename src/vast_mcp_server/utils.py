@@ -1,8 +1,18 @@
-import logging
-import json
 import csv
 import io
-from typing import List, Dict, Any, Union
+import json
+import logging
+from typing import Any, AsyncIterable, Dict, List, Optional, Sequence, Union
+
+try:
+    import orjson  # Optional speed-up, installed via the "fast" extra
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa  # Optional, installed via the "arrow" extra
+except ImportError:
+    pa = None
 
 logger = logging.getLogger(__name__)
 
@@ -30,11 +40,16 @@ def extract_auth_headers(headers: dict) -> tuple[str, str]:
         raise ValueError("Authentication headers are missing.")
 
     # Header keys are case-insensitive in HTTP, but dict keys might be sensitive.
-    # Normalize keys to lower case for lookup.
-    lower_headers = {k.lower(): v for k, v in headers.items()}
-
-    access_key = lower_headers.get('x-vast-access-key')
-    secret_key = lower_headers.get('x-vast-secret-key')
+    # Try the canonical spelling first; scan the headers only for other spellings.
+    access_key = headers.get('X-Vast-Access-Key')
+    secret_key = headers.get('X-Vast-Secret-Key')
+    if access_key is None or secret_key is None:
+        for key, value in headers.items():
+            lower_key = key.lower()
+            if lower_key == 'x-vast-access-key':
+                access_key = value
+            elif lower_key == 'x-vast-secret-key':
+                secret_key = value
 
     if not access_key or not secret_key:
         missing = []
@@ -49,29 +64,166 @@ def extract_auth_headers(headers: dict) -> tuple[str, str]:
 
 # --- Data Formatting Helper ---
 
-def format_data_payload(data: Union[List[Dict[str, Any]], List[str]], format_type: str) -> str:
-    """Formats structured data into a string payload, supporting JSON and CSV.
+def dumps_json(data: Any) -> str:
+    """Serializes `data` as JSON with an indent of 2.
+
+    Uses `orjson` when it is installed (it encodes straight into a C buffer),
+    otherwise the standard library `json` module. Anything orjson refuses, such as an
+    integer wider than 64 bits, is encoded by `json` instead, so installing orjson
+    never turns a result into an error. Output the two encoders both accept still
+    differs: orjson writes non-ASCII text as raw UTF-8 rather than `\\uXXXX` escapes
+    (same decoded value), and NaN/Infinity as `null` where `json` writes the
+    non-standard `NaN`/`Infinity` tokens.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ).decode("utf-8")
+        except (orjson.JSONEncodeError, TypeError) as e:
+            logger.debug(
+                "orjson could not encode payload (%s); falling back to json.", e
+            )
+    return json.dumps(data, indent=2)
+
+def _rows_as_dicts(
+    columns: Sequence[str], rows: Sequence[Sequence[Any]]
+) -> List[Dict[str, Any]]:
+    """Turns rows into `{column: value}` dicts that share one key tuple."""
+    keys = tuple(columns)
+    return [dict(zip(keys, row)) for row in rows]
+
+def _format_columnar_payload(data: Dict[str, Any], format_type: str) -> str:
+    """Formats a db_ops columnar result (`{"columns": [...], "rows": [...]}`)."""
+    columns, rows = data["columns"], data["rows"]
+    if format_type == "columnar":
+        return dumps_json({"columns": columns, "rows": rows})
+    if not rows:
+        return "[]" if format_type == "json" else ""
+    if format_type == "csv":
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        writer.writerows(rows)
+        return output.getvalue()
+    if format_type != "json":
+        logger.warning(
+            "Unsupported format_type '%s' in format_data_payload. Defaulting to JSON.",
+            format_type,
+        )
+    # JSON keeps its array-of-objects shape, so row objects are only built on this path.
+    return dumps_json(_rows_as_dicts(columns, rows))
+
+def _json_array_items(items: List[Any], indent: str = "") -> str:
+    """Returns the elements of `dumps_json(items)` without the enclosing brackets,
+    each line prefixed with `indent`, so piecewise-encoded arrays join with ",\\n"."""
+    body = dumps_json(items)[2:-2] # Strip the leading "[" and trailing "]" lines
+    return indent + body.replace("\n", "\n" + indent) if indent else body
+
+async def format_stream_payload(
+    batches: AsyncIterable[Union[Dict[str, Any], str]], format_type: str
+) -> Optional[str]:
+    """Formats a stream of columnar batches (as yielded by `db_ops.stream_sql_query`).
+
+    Each batch is encoded as soon as it arrives and then dropped, so only the output
+    text is held in memory, never the whole row set. The result is identical to calling
+    `format_data_payload` on the combined rows.
+
+    Args:
+        batches: Columnar results (`{"columns": [...], "rows": [[...], ...]}`), in
+                 order. A string item is an informational message from db_ops (e.g. for
+                 a statement that returns no rows) and is returned as is.
+        format_type: "csv", "json" or "columnar". Unsupported formats default to JSON.
+
+    Returns:
+        The formatted payload or message, or None if the stream yielded no rows.
+    """
+    if format_type not in ("csv", "json", "columnar"):
+        logger.warning(
+            "Unsupported format_type '%s' in format_stream_payload. "
+            "Defaulting to JSON.",
+            format_type,
+        )
+        format_type = "json"
+
+    output = io.StringIO()
+    columns = None
+    message = None
+    async for batch in batches:
+        if isinstance(batch, str):
+            message = batch
+            continue
+        rows = batch["rows"]
+        if not rows:
+            continue
+        if columns is None:
+            columns = batch["columns"]
+            if format_type == "csv":
+                writer = csv.writer(output)
+                writer.writerow(columns)
+            elif format_type == "json":
+                output.write("[\n")
+            else:
+                output.write(
+                    '{\n  "columns": '
+                    + dumps_json(columns).replace("\n", "\n  ")
+                    + ',\n  "rows": [\n'
+                )
+        else:
+            if format_type != "csv":
+                output.write(",\n")
+        if format_type == "csv":
+            writer.writerows(rows)
+        elif format_type == "json":
+            output.write(_json_array_items(_rows_as_dicts(columns, rows)))
+        else:
+            output.write(_json_array_items(rows, "  "))
+
+    if columns is None:
+        return message
+    if format_type == "json":
+        output.write("\n]")
+    elif format_type == "columnar":
+        output.write("\n  ]\n}")
+    return output.getvalue()
+
+def format_data_payload(
+    data: Union[Dict[str, Any], List[Dict[str, Any]], List[str]], format_type: str
+) -> str:
+    """Formats structured data into a string payload: JSON, columnar JSON or CSV.
 
     Used by resource handlers and tools to serialize successful data responses.
 
     Args:
-        data: The data to format, typically a list of dictionaries (for JSON/CSV)
+        data: The data to format: a columnar result from db_ops
+              (`{"columns": [...], "rows": [[...], ...]}`), a list of dictionaries,
               or a list of strings (for CSV, where each string is a row).
-        format_type: The target format. Supported values are "json" and "csv".
-                     If an unsupported format is provided, it defaults to JSON.
+        format_type: The target format. Supported values are "json", "columnar" and
+                     "csv". If an unsupported format is provided, it defaults to JSON.
 
     Returns:
         A string representing the formatted data.
-        - For "json": A JSON string with an indent of 2. Empty list results in "[]".
+        - For "json": A JSON string with an indent of 2 (an array of row objects for
+                      tabular data). Empty list results in "[]".
+        - For "columnar": A JSON object with the column names listed once under
+                          "columns" and each row as an array under "rows".
         - For "csv": A CSV formatted string. Empty list results in an empty string.
                      If `data` is a list of strings, each string is treated as a row.
     """
+    if isinstance(data, dict):
+        return _format_columnar_payload(data, format_type)
+
     if not data: # Handles empty list for both JSON and CSV/list
-        return "[]" if format_type == "json" else ""
+        return "[]" if format_type in ("json", "columnar") else ""
 
-    if format_type == "json":
+    if format_type == "columnar" and isinstance(data[0], dict):
+        columns = list(data[0].keys())
+        rows = [[row.get(c) for c in columns] for row in data]
+        return dumps_json({"columns": columns, "rows": rows})
+
+    if format_type in ("json", "columnar"):
         # JSON serialization errors should be caught by the caller's main handler if they occur.
-        return json.dumps(data, indent=2)
+        return dumps_json(data)
     elif format_type == "csv":
         output = io.StringIO()
         if data: # Ensure data is not empty before trying to access data[0] or iterate
@@ -82,13 +234,23 @@ def format_data_payload(data: Union[List[Dict[str, Any]], List[str]], format_typ
                 writer.writeheader()
                 writer.writerows(data)
             else:
-                # Assume List of Strings -> simple newline separated
-                for item in data:
-                    output.write(str(item) + '\n')
+                # Assume List of Strings -> simple newline separated, joined in one pass
+                return "\n".join(map(str, data)) + "\n"
         return output.getvalue()
     else:
         logger.warning("Unsupported format_type '%s' in format_data_payload. Defaulting to JSON.", format_type)
-        return json.dumps(data, indent=2) # Or raise error, or return as is
+        return dumps_json(data) # Or raise error, or return as is
+
+def format_arrow_payload(table: Any) -> bytes:
+    """Serializes a `pyarrow.Table` in the Arrow IPC streaming format.
+
+    Used by resource handlers for the "arrow" format
+    (content type `application/vnd.apache.arrow.stream`).
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
 
 # --- Error Formatting Helper for Tools ---
 
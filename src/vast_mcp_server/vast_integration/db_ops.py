@@ -1,26 +1,83 @@
-import vastdb
 import asyncio
-import csv
+import atexit
 import io
+import itertools
 import logging # Import logging
-import sqlparse # Added for query validation
+import re
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from functools import lru_cache
+from operator import itemgetter
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+    TypeVar,
+    Union,
+)
+
+import vastdb
+
 from .. import config  # Import configuration from the parent package
-from typing import List, Dict, Any, Union
+
 # Import custom exceptions
 from ..exceptions import (
     DatabaseConnectionError,
+    InvalidInputError,
+    QueryExecutionError,
     SchemaFetchError,
     TableDescribeError,
-    QueryExecutionError,
-    InvalidInputError,
-    VastMcpError
+    VastMcpError,
 )
+from .cache import TTLCache
+from .pool import SessionPool
+
+try:
+    # Optional: enables Arrow results, installed via the "arrow" extra
+    import pyarrow as pa
+except ImportError:
+    pa = None
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
+def _log_error(msg: str, *args: Any) -> None:
+    """Logs a failure at ERROR without a traceback, which goes to DEBUG if enabled.
+
+    Every error logged here is re-raised as a VastMcpError that the handlers log again,
+    so formatting a traceback at ERROR for each failed query only burns CPU under error
+    storms.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args, exc_info=True)
+    logger.error(msg, *args)
+
+class ColumnarResult(TypedDict):
+    """Tabular query result: the column names once, then one value sequence per row.
+
+    Rows are kept exactly as the driver returned them, so no per-row dict is built and
+    column names are not repeated for every row. Use `utils.format_data_payload` to
+    render it as CSV, JSON row objects or columnar JSON.
+    """
+    columns: List[str]
+    rows: List[Sequence[Any]]
+
 # Define a type alias for structured results or specific messages
-QueryResult = Union[List[Dict[str, Any]], str]
+QueryResult = Union[ColumnarResult, str]
 # Define type alias for Schema info (always string for now)
 SchemaResult = str
 # Define type alias for structured Table Metadata
@@ -28,76 +85,624 @@ TableMetadataResult = Dict[str, Any]
 
 # create_vast_connection function has been removed as connections are managed by the application's lifespan.
 
+# --- Connection Access ---
+
+# The lifespan manager hands every request either a SessionPool or one long-lived VAST
+# DB session, and the sync helpers below run on worker threads. DB-API sessions are not
+# safe to drive from several threads at once: a pool gives each borrower a session of
+# its own, while access to a single shared session is serialized here.
+_conn_lock = threading.Lock()
+
+@contextmanager
+def _checkout_session(
+    conn: Union[SessionPool, vastdb.api.VastSession],
+) -> Iterator[Any]:
+    """Yields a session for exclusive use: a pooled one, or `conn` under its lock."""
+    if isinstance(conn, SessionPool):
+        with conn.acquire() as session:
+            yield session
+    else:
+        with _conn_lock:
+            yield conn
+
+@contextmanager
+def _borrow_cursor(conn: Union[SessionPool, vastdb.api.VastSession]) -> Iterator[Any]:
+    """Yields a cursor on a VAST DB session that no other thread is using.
+
+    The cursor is closed on exit (when the driver supports it) so repeated requests
+    reuse the session without accumulating open cursors.
+
+    Args:
+        conn: A SessionPool or an active VAST DB session, typically managed by the
+            application's lifespan.
+
+    Yields:
+        A cursor for the session.
+
+    Raises:
+        DatabaseConnectionError: If no session was provided.
+    """
+    # Identity check: truth-testing a session could call an overloaded __bool__/__len__
+    if conn is None:
+        # This should ideally not happen if the lifespan manager works correctly
+        logger.error("Provided VAST DB connection is None.")
+        raise DatabaseConnectionError("Provided database connection is invalid.")
+    with _checkout_session(conn) as session:
+        cursor = session.cursor()
+        try:
+            yield cursor
+        finally:
+            close = getattr(cursor, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as close_e:
+                    logger.debug("Ignoring error while closing cursor: %s", close_e)
+
+def _prepare_incremental_fetch(cursor: Any, batch_size: int) -> None:
+    """Configures `cursor` so rows are pulled from the server `batch_size` at a time.
+
+    `arraysize` sizes each fetchmany() round trip. Drivers that also offer a server-side
+    (streaming) cursor mode, psycopg-style `itersize` or SQLAlchemy-style
+    `set_stream_results()`, get it switched on so the server does not push the whole
+    result into client memory up front. Drivers without either keep their buffered
+    behaviour. The driver class is inspected rather than the cursor instance so that
+    objects answering every attribute lookup (such as proxies) are not misdetected.
+    """
+    cursor.arraysize = batch_size
+    cursor_type = type(cursor)
+    if hasattr(cursor_type, "itersize"):
+        cursor.itersize = batch_size
+    if callable(getattr(cursor_type, "set_stream_results", None)):
+        cursor.set_stream_results(True)
+
+# --- Worker Threads ---
+
+# The sync helpers below block on the VAST DB driver. They run on a dedicated, bounded
+# pool rather than the event loop's default executor, which is shared with every other
+# blocking call in the process. At most one thread per session can make progress, so
+# threads beyond DB_POOL_SIZE would only wait for a session; extra requests queue here
+# instead of spawning more threads.
+_DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(1, config.DB_THREAD_POOL_SIZE),
+    thread_name_prefix="vastdb",
+)
+atexit.register(_DB_EXECUTOR.shutdown)
+
+_T = TypeVar("_T")
+
+async def _run_in_db_thread(func: Callable[..., _T], *args: Any) -> _T:
+    """Runs a blocking db_ops helper on the VAST DB thread pool and awaits its result.
+
+    The `vastdb` SDK only offers a synchronous API (there is no asyncio transport to
+    await directly), so every coroutine in this module reaches the database through
+    here. This is the one place to switch over if the SDK gains a native async path.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_DB_EXECUTOR, func, *args)
+
+async def run_pool_heartbeat(pool: SessionPool, interval: float) -> None:
+    """Every `interval` seconds, health-checks the pool's sessions idle for at least
+    that long, until cancelled. Keeps idle sessions alive and replaces dropped ones off
+    the request path."""
+    while True:
+        await asyncio.sleep(interval)
+        closed = await _run_in_db_thread(pool.ping_idle, interval)
+        if closed:
+            logger.info(
+                "Session heartbeat closed %d dropped VAST DB session(s).", closed
+            )
+
+# --- Schema Cache ---
+
+# Formatted schemas and raw DESCRIBE TABLE rows are cached per session for
+# config.SCHEMA_CACHE_TTL seconds. VAST DB exposes no cheap schema-version probe, so
+# the "version" is a local DDL generation: it is bumped whenever DDL runs through
+# this server (or on an explicit invalidate_schema_cache call), and entries cached
+# under an older generation never hit. The TTL bounds how long DDL issued by other
+# clients can go unnoticed.
+_SCHEMA_CACHE_MAXSIZE = 512
+_schema_caches: "weakref.WeakKeyDictionary[Any, TTLCache]" = weakref.WeakKeyDictionary()
+_schema_caches_lock = threading.Lock()
+_schema_generation = 0
+# Per-table generations for DDL that touched a single table, so only that table's
+# DESCRIBE rows (and the formatted schemas, which list every table) stop hitting.
+# Cleared whenever the schema generation is bumped, and capped at _SCHEMA_CACHE_MAXSIZE
+# tables: beyond that, single-table DDL invalidates the whole cache instead of adding an
+# entry. Keyed by the case-folded name: unquoted identifiers are case-insensitive, so
+# DDL on "Users" must also invalidate the rows cached for "users".
+_table_generations: Dict[str, int] = {}
+_table_invalidations = 0
+
+# Statement types (as reported by sqlparse) that can change table definitions.
+_SCHEMA_CHANGING_TYPES = frozenset({"CREATE", "CREATE OR REPLACE", "ALTER", "DROP"})
+
+def _session_cache(
+    caches: "weakref.WeakKeyDictionary[Any, TTLCache]",
+    lock: threading.Lock,
+    conn: vastdb.api.VastSession,
+    maxsize: int,
+    ttl: float,
+) -> Optional[TTLCache]:
+    """Returns the cache for `conn` in `caches`, creating it on first use.
+
+    Returns None (no caching) for a missing session or one that cannot be weakly
+    referenced.
+    """
+    if conn is None:
+        return None
+    try:
+        with lock:
+            cache = caches.get(conn)
+            if cache is None:
+                cache = caches[conn] = TTLCache(maxsize, ttl)
+            return cache
+    except TypeError:
+        return None
+
+def _schema_cache_for(conn: vastdb.api.VastSession) -> Optional[TTLCache]:
+    """Returns the schema cache for `conn`, creating it on first use."""
+    return _session_cache(
+        _schema_caches,
+        _schema_caches_lock,
+        conn,
+        _SCHEMA_CACHE_MAXSIZE,
+        config.SCHEMA_CACHE_TTL,
+    )
+
+def _describe_cache_key(table_name: str) -> Tuple[int, int, str, str]:
+    """Cache key for the raw DESCRIBE TABLE rows of `table_name`.
+
+    The schema fetch and the metadata lookup share these entries, so whichever describes
+    a table first saves the other a round trip.
+    """
+    generation = _table_generations.get(table_name.casefold(), 0)
+    return (_schema_generation, generation, "describe", table_name)
+
+def _schema_cache_key() -> Tuple[int, int, str]:
+    """Cache key for the formatted schema of all tables."""
+    return (_schema_generation, _table_invalidations, "schema")
+
+def _table_list_cache_key() -> Tuple[int, int, str]:
+    """Cache key for the SHOW TABLES names; any table DDL can add or remove one."""
+    return (_schema_generation, _table_invalidations, "tables")
+
+def invalidate_schema_cache(table_name: Optional[str] = None) -> None:
+    """Discards cached schema and table metadata entries, for all sessions.
+
+    Args:
+        table_name: If given, only this table's DESCRIBE rows are dropped, along with
+            the formatted schemas (which list every table); other tables stay cached. If
+            None, every entry is discarded.
+    """
+    global _schema_generation, _table_invalidations
+    folded = table_name.casefold() if table_name is not None else None
+    with _schema_caches_lock:
+        if (folded is not None and folded not in _table_generations
+                and len(_table_generations) >= _SCHEMA_CACHE_MAXSIZE):
+            # Too many tracked tables; start over rather than grow without bound
+            folded = None
+        if folded is None:
+            _schema_generation += 1
+            _table_generations.clear() # Superseded by the new generation
+            logger.debug(
+                "Schema cache invalidated (generation %d).", _schema_generation
+            )
+        else:
+            _table_generations[folded] = _table_generations.get(folded, 0) + 1
+            _table_invalidations += 1
+            logger.debug("Schema cache invalidated for table '%s'.", table_name)
+
+# The single plain table named by a CREATE/ALTER/DROP TABLE statement, after any leading
+# comments. Lists, qualified names and other objects (views, schemas) do not match.
+_DDL_TABLE_RE = re.compile(
+    r"(?:\s+|/\*.*?\*/|--[^\n]*(?:\n|$))*"
+    r"(?:CREATE(?:\s+OR\s+REPLACE)?|ALTER|DROP)\s+TABLE\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?"
+    r"([A-Za-z_]\w*)\b(?=\s*(?:[(;]|$|[A-Za-z]))",
+    re.I | re.S,
+)
+_RENAME_RE = re.compile(r"\bRENAME\b", re.I)
+
+def _invalidate_after_ddl(sql: str, statement_type: Optional[str]) -> None:
+    """Invalidates the schema cache after `sql` ran, if it can have changed any table.
+
+    DDL on one plainly named table only drops that table's entries; anything else
+    (renames, several tables, views, schema-qualified names) discards the whole cache.
+    """
+    if statement_type not in _SCHEMA_CHANGING_TYPES:
+        return
+    match = _DDL_TABLE_RE.match(sql)
+    if match is None or _RENAME_RE.search(sql):
+        invalidate_schema_cache()
+    else:
+        invalidate_schema_cache(match.group(1))
+
+# --- Result Cache ---
+
+# Read-only results (table samples and SELECT results) are cached per session for
+# config.RESULT_CACHE_TTL seconds. This is off by default: rows change far more often
+# than table definitions. Any other statement run through this server (INSERT,
+# UPDATE, DDL, ...) bumps the data generation, so nothing cached before a write is
+# served after it.
+_result_caches: "weakref.WeakKeyDictionary[Any, TTLCache]" = weakref.WeakKeyDictionary()
+_result_caches_lock = threading.Lock()
+_data_generation = 0
+
+def _result_cache_for(conn: vastdb.api.VastSession) -> Optional[TTLCache]:
+    """Returns the result cache for `conn`, or None if result caching is disabled."""
+    if config.RESULT_CACHE_TTL <= 0:
+        return None
+    return _session_cache(
+        _result_caches,
+        _result_caches_lock,
+        conn,
+        config.RESULT_CACHE_SIZE,
+        config.RESULT_CACHE_TTL,
+    )
+
+def _cacheable_result(result: QueryResult) -> bool:
+    """True if `result` is small enough to keep (messages always are)."""
+    return (
+        isinstance(result, str) or len(result["rows"]) <= config.RESULT_CACHE_MAX_ROWS
+    )
+
+def invalidate_result_cache() -> None:
+    """Discards every cached sample and SELECT result, for all sessions."""
+    global _data_generation
+    with _result_caches_lock:
+        _data_generation += 1
+    logger.debug("Result cache invalidated (generation %d).", _data_generation)
+
+def _invalidate_caches_after(sql: str, statement_type: Optional[str]) -> None:
+    """Invalidates whatever cached state `sql` may have made stale, after it ran."""
+    if statement_type is not None and statement_type != "SELECT":
+        invalidate_result_cache()
+    _invalidate_after_ddl(sql, statement_type)
+
+# --- SQL Validation Helpers ---
+
+# Leading keywords that sqlparse reports verbatim as the statement type. A query
+# that plainly starts with one of these can be classified without tokenizing the
+# whole string. (CREATE is left out because sqlparse reports e.g. "CREATE OR
+# REPLACE" for some forms.)
+_STATEMENT_KEYWORDS = frozenset({
+    "SELECT", "INSERT", "UPDATE", "DELETE", "UPSERT", "REPLACE", "MERGE",
+    "DROP", "ALTER", "TRUNCATE",
+})
+# First word of a query, skipping leading whitespace, /* block */ and -- comments.
+_LEADING_WORD_RE = re.compile(r"(?:\s+|/\*.*?\*/|--[^\n]*(?:\n|$))*([A-Za-z]+)\b", re.S)
+
+def _is_single_statement(sql: str) -> bool:
+    """True if `sql` has no semicolon except a trailing one. False means "ask sqlparse",
+    not "several statements": a semicolon may sit inside a literal or identifier.
+    """
+    body = sql.rstrip()
+    if body.endswith(";"):
+        body = body[:-1]
+    return ";" not in body
+
+def _leading_keyword(sql: str) -> Optional[str]:
+    """Returns the upper-cased first word of `sql` after leading comments, or None.
+
+    Only the matched word is upper-cased, so long queries are not copied just to
+    inspect their first keyword.
+    """
+    match = _LEADING_WORD_RE.match(sql)
+    return match.group(1).upper() if match else None
+
+# config.ALLOWED_SQL_TYPES as a frozenset and as the joined list quoted in error
+# messages, rebuilt only when the configured list is replaced.
+_allowed_types_snapshot: Tuple[Optional[List[str]], FrozenSet[str], str] = (
+    None,
+    frozenset(),
+    "",
+)
+
+def _allowed_types_config() -> Tuple[Optional[List[str]], FrozenSet[str], str]:
+    """Returns the current `(configured list, frozenset, joined list)` snapshot."""
+    global _allowed_types_snapshot
+    configured = config.ALLOWED_SQL_TYPES
+    if _allowed_types_snapshot[0] is not configured:
+        _allowed_types_snapshot = (
+            configured,
+            frozenset(t.upper() for t in configured),
+            ", ".join(configured),
+        )
+    return _allowed_types_snapshot
+
+def _allowed_sql_types() -> FrozenSet[str]:
+    """Returns the allowed statement types as a frozenset for O(1) lookups."""
+    return _allowed_types_config()[1]
+
+def _not_allowed_error(statement_type: str, sql: str) -> InvalidInputError:
+    """Logs and builds the error for a statement type that is not allowed."""
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(
+            "Rejected non-allowed query type '%s': %s...", statement_type, sql[:100]
+        )
+    allowed_str = _allowed_types_config()[2]
+    return InvalidInputError(
+        f"Query type '{statement_type}' is not allowed. Allowed types: {allowed_str}."
+    )
+
+# --- Input Validation Helpers ---
+
+def _validate_table_name(table_name: str) -> None:
+    """Raises InvalidInputError unless `table_name` is a plain, SQL-safe identifier."""
+    if not isinstance(table_name, str) or not table_name.isidentifier():
+        logger.warning("Invalid table name requested: %s", table_name)
+        raise InvalidInputError(f"Invalid table name '{table_name}'.")
+
+def _validate_limit(limit: Any, default: int = 10) -> int:
+    """Returns `limit` if it is a positive int, otherwise logs and returns `default`."""
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit <= 0:
+        logger.warning(
+            "Invalid limit %s provided for table sample, defaulting to %d.",
+            limit,
+            default,
+        )
+        return default
+    return limit
+
+# --- Row Helpers ---
+
+_FIRST = itemgetter(0)
+
+def _table_names(rows: Sequence[Sequence[Any]]) -> List[str]:
+    """Extracts table names from SHOW TABLES rows, skipping empty rows and names."""
+    return list(filter(None, map(_FIRST, filter(None, rows))))
+
+def _column_names(description: Optional[Sequence[Sequence[Any]]]) -> List[str]:
+    """Extracts the column names from a DB-API `cursor.description` (empty if none).
+
+    Names are interned, so repeated queries against the same table hand out the same key
+    objects; row dicts and the row-dict factory cache then share keys instead of holding
+    a fresh copy per call.
+    """
+    if not description:
+        return []
+    return [
+        sys.intern(name) if type(name) is str else name
+        for name in map(_FIRST, description)
+    ]
+
+# --- Statement Text ---
+
+# Statement text for the fixed-shape queries, memoized per table (and limit). The DB-API
+# layer offers no portable prepare() or bound LIMIT parameter, so instead each repeated
+# request reuses one identical string; this also keeps the text byte-for-byte stable for
+# any server-side statement/plan cache. Table names are either validated identifiers or
+# come from the server's own table list.
+
+@lru_cache(maxsize=256)
+def _describe_sql(table_name: str) -> str:
+    return f"DESCRIBE TABLE {table_name}"
+
+@lru_cache(maxsize=1024)
+def _sample_sql(table_name: str, limit: int) -> str:
+    # Callers validate first; checking again here costs nothing on a cache hit and keeps
+    # any future caller from splicing unchecked text into the statement.
+    _validate_table_name(table_name)
+    if type(limit) is not int or limit <= 0:
+        raise InvalidInputError(f"Invalid sample limit: {limit!r}.")
+    return f"SELECT * FROM {table_name} LIMIT {limit}"
+
 # --- Database Operations ---
 
-def _fetch_schema_sync(conn: vastdb.api.VastSession) -> SchemaResult:
+# Single set-oriented catalog query that describes every table at once, replacing the
+# SHOW TABLES + per-table DESCRIBE round trips where the server supports it.
+_CATALOG_COLUMNS_SQL = (
+    "SELECT table_name, column_name, data_type FROM information_schema.columns "
+    "WHERE table_schema <> 'information_schema' "
+    "ORDER BY table_name, ordinal_position"
+)
+
+# Sessions whose server rejected the catalog query. The schema fetch goes straight
+# to the SHOW TABLES / DESCRIBE path for these instead of failing the catalog
+# query every time.
+_sessions_without_catalog: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+def _catalog_unsupported(conn: vastdb.api.VastSession) -> bool:
+    try:
+        return conn in _sessions_without_catalog
+    except TypeError: # Session type does not support weak references
+        return False
+
+def _mark_catalog_unsupported(conn: vastdb.api.VastSession) -> None:
+    try:
+        _sessions_without_catalog.add(conn)
+    except TypeError:
+        pass
+
+def _format_table_schema(
+    schema_buf: io.StringIO, table_name: str, columns: Iterable[Sequence[Any]]
+) -> None:
+    """Writes one table's schema block (name, a line per column, blank line)."""
+    write = schema_buf.write
+    write(f"TABLE: {table_name}\n")
+    for col in columns:
+        write(f"  - {col[0]} ({col[1]})\n") # Assuming name, type are first 2
+    write("\n")
+
+def _schema_from_catalog(cursor: Any) -> Optional[SchemaResult]:
+    """Builds the schema string from a single information_schema query.
+
+    Returns:
+        The formatted schema, or None if the catalog returned no columns, in which case
+        the caller should fall back to SHOW TABLES / DESCRIBE.
+    """
+    cursor.execute(_CATALOG_COLUMNS_SQL)
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    schema_buf = io.StringIO()
+    table_count = 0
+    for table_name, table_rows in itertools.groupby(rows, key=_FIRST):
+        _format_table_schema(schema_buf, table_name, (row[1:] for row in table_rows))
+        table_count += 1
+    logger.info("Described %d tables from information_schema.", table_count)
+    return schema_buf.getvalue()
+
+def _describe_rows(
+    cursor: Any, cache: Optional[TTLCache], table_name: str
+) -> List[Sequence[Any]]:
+    """Returns the DESCRIBE TABLE rows for `table_name`, from `cache` or the DB."""
+    cache_key = _describe_cache_key(table_name)
+    columns = cache.get(cache_key) if cache is not None else None
+    if columns is None:
+        # Using DESCRIBE or similar command - adjust SQL if needed for VAST DB
+        cursor.execute(_describe_sql(table_name))
+        columns = cursor.fetchall()
+        if cache is not None and columns:
+            cache.set(cache_key, columns)
+    return columns
+
+def _format_describe_error(
+    schema_buf: io.StringIO,
+    table_name: str,
+    desc_e: Exception,
+    describe_errors: List[str],
+) -> None:
+    """Records a failed DESCRIBE and writes an error block for it to `schema_buf`."""
+    logger.warning("Error describing table '%s': %s", table_name, desc_e)
+    # Store the error to potentially raise later or include in message
+    describe_errors.append(f"Error describing table '{table_name}': {desc_e}")
+    # Add error indication to the output schema string
+    schema_buf.write(
+        f"TABLE: {table_name}\n  - !!! Error describing table: {desc_e} !!!\n\n"
+    )
+
+def _cached_table_names(cache: Optional[TTLCache]) -> Optional[List[str]]:
+    """Returns a copy of the cached SHOW TABLES names, or None on a miss."""
+    table_names = cache.get(_table_list_cache_key()) if cache is not None else None
+    return list(table_names) if table_names is not None else None
+
+def _show_tables(cursor: Any, cache: Optional[TTLCache] = None) -> List[str]:
+    """Returns the SHOW TABLES names, cached for config.TABLE_LIST_TTL seconds."""
+    table_names = _cached_table_names(cache)
+    if table_names is not None:
+        logger.debug("Using cached SHOW TABLES result.")
+        return table_names
+    cache_key = _table_list_cache_key()
+    logger.debug("Executing SHOW TABLES")
+    cursor.execute("SHOW TABLES")
+    table_names = _table_names(cursor.fetchall())
+    logger.info("Found %d tables: %s", len(table_names), table_names)
+    if cache is not None:
+        cache.set(cache_key, tuple(table_names), ttl=config.TABLE_LIST_TTL)
+    return table_names
+
+_NO_TABLES_MESSAGE = "-- No tables found in the database. --"
+
+def _schema_from_describe(
+    cursor: Any, cache: Optional[TTLCache], describe_errors: List[str]
+) -> SchemaResult:
+    """Builds the schema string with SHOW TABLES and one DESCRIBE TABLE per table.
+
+    Tables whose DESCRIBE rows are already in `cache` are not described again. Tables
+    that fail to describe get an error line in the output, and the error is appended to
+    `describe_errors`.
+    """
+    table_names = _show_tables(cursor, cache)
+    if not table_names:
+         logger.warning("No tables found in database.")
+         return _NO_TABLES_MESSAGE
+
+    schema_buf = io.StringIO()
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    for table_name in table_names:
+        if debug_enabled:
+            logger.debug("Describing table: %s", table_name)
+        try:
+            _format_table_schema(
+                schema_buf, table_name, _describe_rows(cursor, cache, table_name)
+            )
+            if debug_enabled:
+                logger.debug("Successfully described table: %s", table_name)
+        except Exception as desc_e:
+            _format_describe_error(schema_buf, table_name, desc_e, describe_errors)
+            # To stop the whole process on the first failure, raise immediately instead:
+            # raise TableDescribeError(
+            #     f"Failed to describe table '{table_name}': {desc_e}",
+            #     original_exception=desc_e,
+            # )
+
+    schema_output = schema_buf.getvalue()
+    # If we encountered errors describing *some* tables, we could still return the
+    # partial schema or raise a higher-level error. Let's return partial for now,
+    # logging indicates issues.
+    if describe_errors:
+        logger.warning(
+            "Finished schema fetch with %d describe errors.", len(describe_errors)
+        )
+    return schema_output
+
+def _fetch_schema_sync(
+    conn: vastdb.api.VastSession, describe_fallback: bool = True
+) -> Optional[SchemaResult]:
     """Synchronous helper to fetch and format schema using an active VAST DB connection.
 
+    The whole schema is read with one information_schema query when the server supports
+    it (and config.USE_INFO_SCHEMA is on); otherwise, or if the catalog is empty, it
+    falls back to SHOW TABLES plus one DESCRIBE TABLE per table.
+
     Args:
         conn: An active VAST DB session, typically managed by the application's lifespan.
+        describe_fallback: If False, return None instead of running the per-table
+            fallback, so the caller can describe the tables concurrently.
 
     Returns:
-        str: A string representation of the database schema.
+        str: A string representation of the database schema (None only as above).
 
     Raises:
         SchemaFetchError: If unable to fetch schema.
         TableDescribeError: If unable to describe tables.
     """
     logger.debug("Starting synchronous schema fetch with provided connection.")
+    cache = _schema_cache_for(conn)
+    cache_key = _schema_cache_key()
+    if cache is not None:
+        cached_schema = cache.get(cache_key)
+        if cached_schema is not None:
+            logger.debug("Returning cached schema.")
+            return cached_schema
+
+    use_catalog = config.USE_INFO_SCHEMA and not _catalog_unsupported(conn)
+    if not use_catalog and not describe_fallback:
+        return None # Nothing to run here, so do not tie up a session
+
     try:
-        if not conn:
-             logger.error("Provided VAST DB connection is None for schema fetch.")
-             # This should ideally not happen if lifespan manager works correctly
-             raise DatabaseConnectionError("Provided database connection is invalid.")
-        cursor = conn.cursor()
-
-        logger.debug("Executing SHOW TABLES")
-        cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
-        table_names = [t[0] for t in tables if t]
-        logger.info("Found %d tables: %s", len(table_names), table_names)
-
-        if not table_names:
-             logger.warning("No tables found in database.")
-             return "-- No tables found in the database. --"
-
-        schema_parts = []
-        describe_errors = []
-        for table_name in table_names:
-            logger.debug("Describing table: %s", table_name)
-            try:
-                # Using DESCRIBE or similar command - adjust SQL if needed for VAST DB
-                cursor.execute(f"DESCRIBE TABLE {table_name}")
-                columns = cursor.fetchall()
-                schema_parts.append(f"TABLE: {table_name}")
-                col_defs = [f"  - {col[0]} ({col[1]})" for col in columns] # Assuming name, type are first 2
-                schema_parts.extend(col_defs)
-                schema_parts.append("")
-                logger.debug("Successfully described table: %s", table_name)
-            except Exception as desc_e:
-                logger.warning("Error describing table '%s': %s", table_name, desc_e)
-                # Store the error to potentially raise later or include in message
-                describe_errors.append(f"Error describing table '{table_name}': {desc_e}")
-                # Add error indication to the output schema string
-                schema_parts.append(f"TABLE: {table_name}")
-                schema_parts.append(f"  - !!! Error describing table: {desc_e} !!!")
-                schema_parts.append("")
-                # Optionally, raise immediately if one failure should stop the whole process:
-                # raise TableDescribeError(f"Failed to describe table '{table_name}': {desc_e}", original_exception=desc_e)
-
-        schema_output = "\n".join(schema_parts)
-        # If we encountered errors describing *some* tables, we could still return the partial schema
-        # or raise a higher-level error. Let's return partial for now, logging indicates issues.
-        if describe_errors:
-            logger.warning("Finished schema fetch with %d describe errors.", len(describe_errors))
-
-        logger.debug("Schema fetch completed.")
-        return schema_output
-
-    # Removed DatabaseConnectionError catch as connection is now passed in.
-    # Lifespan manager handles initial connection. If conn is bad, cursor ops will fail.
+        with _borrow_cursor(conn) as cursor:
+            schema_output = None
+            if use_catalog:
+                try:
+                    schema_output = _schema_from_catalog(cursor)
+                except Exception as catalog_e:
+                    logger.info(
+                        "information_schema not available, "
+                        "falling back to DESCRIBE per table: %s",
+                        catalog_e,
+                    )
+                    _mark_catalog_unsupported(conn)
+
+            describe_errors: List[str] = []
+            if schema_output is None:
+                if not describe_fallback:
+                    return None
+                schema_output = _schema_from_describe(cursor, cache, describe_errors)
+
+            # A partial schema (some tables failed to describe) is returned but not
+            # cached, so the next request retries those tables.
+            if cache is not None and not describe_errors:
+                cache.set(cache_key, schema_output)
+            logger.debug("Schema fetch completed.")
+            return schema_output
+
+    except DatabaseConnectionError:
+        raise # A missing session is not a schema problem; let callers map it themselves
     except Exception as e:
-        logger.error("Generic error during schema fetch: %s", e, exc_info=True)
+        _log_error("Generic error during schema fetch: %s", e)
         raise SchemaFetchError(f"Error fetching schema: {e}", original_exception=e)
     # finally block for closing connection is removed as it's managed by the lifespan.
 
@@ -111,7 +716,94 @@ async def get_db_schema(conn: vastdb.api.VastSession) -> SchemaResult:
         A string representation of the database schema.
     """
     logger.info("Received request to fetch DB schema.")
-    return await asyncio.to_thread(_fetch_schema_sync, conn)
+    if not isinstance(conn, SessionPool) or conn.max_size < 2:
+        # One session: the tables would be described one after another anyway.
+        return await _run_in_db_thread(_fetch_schema_sync, conn)
+    schema_output = await _run_in_db_thread(_fetch_schema_sync, conn, False)
+    if schema_output is None:
+        schema_output = await _fetch_schema_by_describe(conn)
+    return schema_output
+
+async def warm_schema_cache(conn: vastdb.api.VastSession) -> None:
+    """Fetches the schema once so the first client request for it hits the cache.
+
+    Meant to run as a background task at startup. Failures are logged, not raised: the
+    schema is simply fetched on first request instead.
+    """
+    try:
+        await get_db_schema(conn)
+    except VastMcpError as e:
+        logger.warning(
+            "Schema warmup failed; the schema will be fetched on first request: %s", e
+        )
+    else:
+        logger.info("Schema cache warmed.")
+
+def _show_tables_sync(
+    conn: vastdb.api.VastSession, cache: Optional[TTLCache]
+) -> List[str]:
+    table_names = _cached_table_names(cache)
+    if table_names is not None:
+        return table_names
+    with _borrow_cursor(conn) as cursor:
+        return _show_tables(cursor, cache)
+
+def _describe_rows_sync(
+    conn: vastdb.api.VastSession, cache: Optional[TTLCache], table_name: str
+) -> List[Sequence[Any]]:
+    with _borrow_cursor(conn) as cursor:
+        return _describe_rows(cursor, cache, table_name)
+
+async def _fetch_schema_by_describe(conn: SessionPool) -> SchemaResult:
+    """Builds the schema with SHOW TABLES and per-table DESCRIBEs, run concurrently.
+
+    Up to config.SCHEMA_DESCRIBE_CONCURRENCY tables (never more than the pool has
+    sessions) are described at once, each on its own pooled session, so a large schema
+    costs roughly tables / concurrency round trips instead of one per table. Output
+    order and error handling match the sequential fallback in `_fetch_schema_sync`.
+    """
+    cache = _schema_cache_for(conn)
+    cache_key = _schema_cache_key()
+    try:
+        table_names = await _run_in_db_thread(_show_tables_sync, conn, cache)
+    except DatabaseConnectionError:
+        raise
+    except Exception as e:
+        _log_error("Generic error during schema fetch: %s", e)
+        raise SchemaFetchError(f"Error fetching schema: {e}", original_exception=e)
+    if not table_names:
+        logger.warning("No tables found in database.")
+        return _NO_TABLES_MESSAGE
+
+    semaphore = asyncio.Semaphore(
+        max(1, min(config.SCHEMA_DESCRIBE_CONCURRENCY, conn.max_size))
+    )
+
+    async def describe(table_name: str) -> List[Sequence[Any]]:
+        async with semaphore:
+            return await _run_in_db_thread(_describe_rows_sync, conn, cache, table_name)
+
+    results = await asyncio.gather(*map(describe, table_names), return_exceptions=True)
+
+    schema_buf = io.StringIO()
+    describe_errors: List[str] = []
+    for table_name, result in zip(table_names, results):
+        if isinstance(result, Exception):
+            _format_describe_error(schema_buf, table_name, result, describe_errors)
+        elif isinstance(result, BaseException):
+            raise result # Cancellation, not a describe failure
+        else:
+            _format_table_schema(schema_buf, table_name, result)
+
+    schema_output = schema_buf.getvalue()
+    if describe_errors:
+        logger.warning(
+            "Finished schema fetch with %d describe errors.", len(describe_errors)
+        )
+    elif cache is not None:
+        cache.set(cache_key, schema_output)
+    logger.debug("Schema fetch completed.")
+    return schema_output
 
 def _list_tables_sync(conn: vastdb.api.VastSession) -> List[str]:
     """Synchronous helper to fetch table names using an active VAST DB connection.
@@ -124,18 +816,11 @@ def _list_tables_sync(conn: vastdb.api.VastSession) -> List[str]:
     """
     logger.debug("Starting synchronous table list fetch with provided connection.")
     try:
-        if not conn:
-            logger.error("Provided VAST DB connection is None for listing tables.")
-            raise DatabaseConnectionError("Provided database connection is invalid.")
-        cursor = conn.cursor()
-        logger.debug("Executing SHOW TABLES")
-        cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
-        table_names = [t[0] for t in tables if t]
-        logger.info("Found %d tables: %s", len(table_names), table_names)
-        return table_names
+        return _show_tables_sync(conn, _schema_cache_for(conn))
+    except DatabaseConnectionError:
+        raise # Propagate connection problems directly
     except Exception as e:
-        logger.error("Error executing SHOW TABLES: %s", e, exc_info=True)
+        _log_error("Error executing SHOW TABLES: %s", e)
         raise QueryExecutionError(f"Failed to list tables: {e}", original_exception=e)
     # finally block for closing connection is removed as it's managed by the lifespan.
 
@@ -149,36 +834,39 @@ async def list_tables(conn: vastdb.api.VastSession) -> List[str]:
         A list of table names.
     """
     logger.info("Received request to list tables.")
-    return await asyncio.to_thread(_list_tables_sync, conn)
+    return await _run_in_db_thread(_list_tables_sync, conn)
 
 def _get_table_metadata_sync(conn: vastdb.api.VastSession, table_name: str) -> TableMetadataResult:
     """Synchronous helper to get metadata for a specific table using an active VAST DB connection.
 
     Args:
         conn: An active VAST DB session.
-        table_name: The name of the table to describe.
+        table_name: The name of the table to describe, already checked by
+            `_validate_table_name`.
 
     Returns:
         A dictionary containing the table's metadata.
     """
     logger.debug("Starting synchronous metadata fetch for table '%s' with provided connection.", table_name)
     try:
-        # Basic input validation
-        if not table_name.isidentifier():
-            logger.warning("Invalid table name requested for metadata: %s", table_name)
-            raise InvalidInputError(f"Invalid table name '{table_name}'.")
-
-        if not conn:
-            logger.error("Provided VAST DB connection is None for table metadata fetch.")
-            raise DatabaseConnectionError("Provided database connection is invalid.")
-        cursor = conn.cursor()
-
-        logger.debug("Describing table: %s", table_name)
-        cursor.execute(f"DESCRIBE TABLE {table_name}")
-        columns_raw = cursor.fetchall()
-        if not columns_raw:
-            logger.warning("DESCRIBE TABLE %s returned no columns.", table_name)
-            raise TableDescribeError(f"Could not retrieve column information for table '{table_name}' (table might not exist or is empty).")
+        cache = _schema_cache_for(conn)
+        cache_key = _describe_cache_key(table_name)
+        columns_raw = cache.get(cache_key) if cache is not None else None
+        if columns_raw is None:
+            with _borrow_cursor(conn) as cursor:
+                logger.debug("Describing table: %s", table_name)
+                cursor.execute(_describe_sql(table_name))
+                columns_raw = cursor.fetchall()
+            if not columns_raw:
+                logger.warning("DESCRIBE TABLE %s returned no columns.", table_name)
+                raise TableDescribeError(
+                    f"Could not retrieve column information for table '{table_name}' "
+                    "(table might not exist or is empty)."
+                )
+            if cache is not None:
+                cache.set(cache_key, columns_raw)
+        else:
+            logger.debug("Using cached DESCRIBE output for table '%s'.", table_name)
 
         # Attempt to parse more details from DESCRIBE output
         # Assuming format: (name, type, nullable, key, default, extra)
@@ -187,7 +875,7 @@ def _get_table_metadata_sync(conn: vastdb.api.VastSession, table_name: str) -> T
         for col in columns_raw:
             if not col or len(col) < 2:
                 continue # Skip malformed rows
-            
+
             col_meta = {
                 "name": col[0],
                 "type": col[1],
@@ -208,12 +896,11 @@ def _get_table_metadata_sync(conn: vastdb.api.VastSession, table_name: str) -> T
         logger.info("Successfully described table '%s'. Found %d columns.", table_name, len(columns_metadata))
         return metadata
 
-    except InvalidInputError:
-        raise # Propagate invalid input directly
-    # Removed DatabaseConnectionError catch as connection is now passed in.
+    except DatabaseConnectionError:
+        raise # Propagate connection problems directly
     except Exception as e:
         # Treat other exceptions during describe as TableDescribeError
-        logger.error("Error describing table '%s': %s", table_name, e, exc_info=True)
+        _log_error("Error describing table '%s': %s", table_name, e)
         raise TableDescribeError(f"Failed to describe table '{table_name}': {e}", original_exception=e)
     # finally block for closing connection is removed as it's managed by the lifespan.
 
@@ -228,57 +915,67 @@ async def get_table_metadata(conn: vastdb.api.VastSession, table_name: str) -> T
         A dictionary containing the table's metadata.
     """
     logger.info("Received request for metadata for table: %s", table_name)
-    return await asyncio.to_thread(_get_table_metadata_sync, conn, table_name)
+    # Reject bad input here so it never occupies a DB worker thread
+    _validate_table_name(table_name)
+    return await _run_in_db_thread(_get_table_metadata_sync, conn, table_name)
 
 def _fetch_table_sample_sync(conn: vastdb.api.VastSession, table_name: str, limit: int) -> QueryResult:
     """Synchronous helper to fetch table sample data using an active VAST DB connection.
 
     Args:
         conn: An active VAST DB session.
-        table_name: The name of the table to sample.
-        limit: The maximum number of rows to return.
+        table_name: The name of the table to sample, already checked by
+            `_validate_table_name`.
+        limit: The maximum number of rows to return, already checked by
+            `_validate_limit`.
 
     Returns:
-        A list of dictionaries representing table rows, or a string message if no data.
+        A columnar result holding the table rows, or a string message if no data.
     """
-    logger.debug("Starting synchronous table sample fetch for table '%s' limit %d with provided connection.", table_name, limit)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Starting synchronous table sample fetch for table '%s' limit %d "
+            "with provided connection.",
+            table_name,
+            limit,
+        )
+    # Built before borrowing a session, so bad input never counts against the session
+    query = _sample_sql(table_name, limit)
     try:
-        if not conn:
-            logger.error("Provided VAST DB connection is None for table sample fetch.")
-            raise DatabaseConnectionError("Provided database connection is invalid.")
-        cursor = conn.cursor()
-
-        # Basic input validation
-        if not table_name.isidentifier():
-             logger.warning("Invalid table name requested for sample: %s", table_name)
-             raise InvalidInputError(f"Invalid table name '{table_name}'.")
-        if not isinstance(limit, int) or limit <= 0:
-            logger.warning("Invalid limit %s provided for table sample, defaulting to 10.", limit)
-            limit = 10
-
-        query = f"SELECT * FROM {table_name} LIMIT {limit}"
-        logger.debug("Executing query: %s", query)
-        cursor.execute(query)
-
-        results = cursor.fetchall()
-        column_names = [desc[0] for desc in cursor.description] if cursor.description else []
-        logger.info("Fetched %d rows from table '%s' with columns: %s", len(results), table_name, column_names)
-
-        if not results:
-            logger.info("No data found in table '%s' for sample.", table_name)
-            return f"-- No data found in table '{table_name}' or table does not exist. --"
-
-        # Convert results to list of dictionaries
-        structured_results = [dict(zip(column_names, row)) for row in results]
-        logger.debug("Returning %d structured results for '%s'.", len(structured_results), table_name)
-        return structured_results
-
-    except InvalidInputError:
-        raise # Propagate invalid input errors directly
-    # Removed DatabaseConnectionError catch as connection is now passed in.
+        with _borrow_cursor(conn) as cursor:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executing query: %s", query)
+            # Size the driver's fetch buffer to the sample so the rows
+            # arrive in a single batch, and read at most `limit` rows even
+            # if the server over-delivers.
+            _prepare_incremental_fetch(cursor, limit)
+            cursor.execute(query)
+
+            results = cursor.fetchmany(limit)
+            if not results:
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("No data found in table '%s' for sample.", table_name)
+                return (
+                    f"-- No data found in table '{table_name}' "
+                    "or table does not exist. --"
+                )
+
+            # Column names are only needed once we know there are rows to return.
+            column_names = _column_names(cursor.description)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Fetched %d rows from table '%s' with columns: %s",
+                    len(results),
+                    table_name,
+                    column_names,
+                )
+            return ColumnarResult(columns=column_names, rows=results)
+
+    except DatabaseConnectionError:
+        raise # Propagate connection problems directly
     except Exception as e:
         # Assume other errors are query execution related for this function
-        logger.error("Error executing sample query for table '%s': %s", table_name, e, exc_info=True)
+        _log_error("Error executing sample query for table '%s': %s", table_name, e)
         raise QueryExecutionError(f"Failed to execute sample query for table '{table_name}': {e}", original_exception=e)
     # finally block for closing connection is removed as it's managed by the lifespan.
 
@@ -291,28 +988,134 @@ async def get_table_sample(conn: vastdb.api.VastSession, table_name: str, limit:
         limit: The maximum number of rows to return.
 
     Returns:
-        A list of dictionaries representing table rows, or a string message if no data.
+        A columnar result holding the table rows, or a string message if no data.
     """
+    # Reject bad input here so it never occupies a DB worker thread
+    _validate_table_name(table_name)
+    limit = _validate_limit(limit)
     logger.info("Received request for table sample: table='%s', limit=%d", table_name, limit)
-    return await asyncio.to_thread(_fetch_table_sample_sync, conn, table_name, limit)
+    cache = _result_cache_for(conn)
+    if cache is None:
+        return await _run_in_db_thread(
+            _fetch_table_sample_sync, conn, table_name, limit
+        )
+
+    cache_key = (_data_generation, "sample", table_name, limit)
+    result = cache.get(cache_key)
+    if result is None:
+        result = await _run_in_db_thread(
+            _fetch_table_sample_sync, conn, table_name, limit
+        )
+        if _cacheable_result(result):
+            cache.set(cache_key, result)
+    else:
+        logger.debug("Returning cached sample for table '%s'.", table_name)
+    return result
+
+def _rows_to_arrow(
+    column_names: List[str], rows: Sequence[Sequence[Any]]
+) -> "pa.Table":
+    """Builds an Arrow table from DB-API rows, one column array at a time."""
+    columns = list(zip(*rows)) if rows else [()] * len(column_names)
+    return pa.Table.from_arrays(
+        [pa.array(values) for values in columns], names=column_names
+    )
+
+def _fetch_table_sample_arrow_sync(
+    conn: vastdb.api.VastSession, table_name: str, limit: int
+) -> "pa.Table":
+    """Synchronous helper to fetch a table sample as an Arrow table.
+
+    Drivers with a native Arrow fetch (`cursor.fetch_arrow_table()`) hand over their
+    columnar buffers directly; otherwise the DB-API rows are converted column by column.
 
-def _execute_sql_sync(conn: vastdb.api.VastSession, sql: str) -> QueryResult:
-    """Synchronous helper to execute SQL query using an active VAST DB connection.
+    Args:
+        conn: An active VAST DB session.
+        table_name: The name of the table to sample, already checked by
+            `_validate_table_name`.
+        limit: The maximum number of rows to return, already checked by
+            `_validate_limit`.
 
-    Validates the SQL query type against configured allowed types before execution.
+    Returns:
+        An Arrow table holding up to `limit` rows (possibly none).
+    """
+    # Before borrowing a session, like _fetch_table_sample_sync
+    query = _sample_sql(table_name, limit)
+    try:
+        with _borrow_cursor(conn) as cursor:
+            _prepare_incremental_fetch(cursor, limit)
+            cursor.execute(query)
+            if callable(getattr(type(cursor), "fetch_arrow_table", None)):
+                return cursor.fetch_arrow_table()
+            rows = cursor.fetchmany(limit)
+            column_names = _column_names(cursor.description)
+            return _rows_to_arrow(column_names, rows)
+
+    except DatabaseConnectionError:
+        raise # Propagate connection problems directly
+    except Exception as e:
+        _log_error(
+            "Error executing Arrow sample query for table '%s': %s", table_name, e
+        )
+        raise QueryExecutionError(
+            f"Failed to execute sample query for table '{table_name}': {e}",
+            original_exception=e,
+        )
+
+async def get_table_sample_arrow(
+    conn: vastdb.api.VastSession, table_name: str, limit: int
+) -> "pa.Table":
+    """Fetches a table sample as an Arrow table, without building Python rows.
 
     Args:
         conn: An active VAST DB session.
-        sql: The SQL query string to execute.
+        table_name: The name of the table to sample.
+        limit: The maximum number of rows to return.
 
     Returns:
-        A list of dictionaries representing query results, or a string message for non-SELECT queries
-        or if no data is returned.
+        A `pyarrow.Table` holding the sampled rows.
+
+    Raises:
+        InvalidInputError: If pyarrow is not installed, or the table name is invalid.
     """
-    logger.debug("Starting synchronous SQL execution: %s...", sql[:100])
+    if pa is None:
+        raise InvalidInputError(
+            "Arrow output is not available: pyarrow is not installed on the server."
+        )
+    _validate_table_name(table_name)
+    limit = _validate_limit(limit)
+    logger.info(
+        "Received request for Arrow table sample: table='%s', limit=%d",
+        table_name,
+        limit,
+    )
+    return await _run_in_db_thread(
+        _fetch_table_sample_arrow_sync, conn, table_name, limit
+    )
+
+@lru_cache(maxsize=config.SQL_PARSE_CACHE_SIZE)
+def _classify_sql(sql: str) -> str:
+    """Returns the statement type of one SQL statement, as sqlparse would report it.
+
+    A query that starts with a plain statement keyword and contains no semicolon (other
+    than one at the very end or inside a string literal) is classified from that
+    keyword alone; it cannot hold a second statement. Everything else (WITH,
+    parentheses, separating semicolons, ...) is parsed with sqlparse. Results are
+    cached by the SQL text, so repeated queries are classified only once. The
+    allowed-types check is deliberately left to the caller, so a change to
+    `config.ALLOWED_SQL_TYPES` takes effect immediately.
+
+    Raises:
+        InvalidInputError: If the query is empty, has several statements or won't parse.
+    """
+    leading_keyword = _leading_keyword(sql)
+    if leading_keyword in _STATEMENT_KEYWORDS and _is_single_statement(sql):
+        return leading_keyword
 
-    # --- Query Validation using sqlparse ---
     try:
+        # Deferred: most queries never reach this point, so it loads on first use
+        import sqlparse
+
         # Parse the SQL. sqlparse returns a list of statements.
         parsed_statements = sqlparse.parse(sql)
 
@@ -323,77 +1126,490 @@ def _execute_sql_sync(conn: vastdb.api.VastSession, sql: str) -> QueryResult:
 
         # For now, we only support a single statement per request
         if len(parsed_statements) > 1:
-            logger.warning("Rejected multi-statement SQL query: %s...", sql[:100])
+            if logger.isEnabledFor(logging.WARNING):
+                logger.warning("Rejected multi-statement SQL query: %s...", sql[:100])
             raise InvalidInputError("Multi-statement SQL queries are not allowed.")
 
-        statement = parsed_statements[0]
-        statement_type = statement.get_type()
-
-        # Allow only configured statement types
-        allowed_types = config.ALLOWED_SQL_TYPES
-        if statement_type not in allowed_types:
-            logger.warning("Rejected non-allowed query type '%s': %s...", statement_type, sql[:100])
-            # Dynamically generate the error message based on configured allowed types
-            allowed_str = ", ".join(allowed_types)
-            raise InvalidInputError(f"Query type '{statement_type}' is not allowed. Allowed types: {allowed_str}.")
-
-        logger.debug("SQL query validated as type: %s (Allowed: %s)", statement_type, ", ".join(allowed_types))
+        return parsed_statements[0].get_type()
 
     except InvalidInputError:
         raise # Re-raise our specific validation errors
     except Exception as parse_e:
         # Catch potential errors during parsing itself
-        logger.error("Error parsing SQL query: %s", parse_e, exc_info=True)
+        _log_error("Error parsing SQL query: %s", parse_e)
         raise InvalidInputError(f"Failed to parse SQL query: {parse_e}")
-    # --- End Query Validation ---
 
-    try:
-        if not conn:
-            logger.error("Provided VAST DB connection is None for SQL execution.")
-            raise DatabaseConnectionError("Provided database connection is invalid.")
-        cursor = conn.cursor()
-
-        logger.debug("Executing validated SQL query.")
-        cursor.execute(sql) # Execute the original, validated SQL
-
-        # Check if the query was meant to return results (e.g., SELECT)
-        if cursor.description is None:
-            logger.info("SQL query executed, but did not return results (e.g., non-SELECT or empty result).")
-            # Check if it was a SELECT that genuinely returned nothing vs. another type (though we block others)
-            if statement_type == 'SELECT':
-                return "-- Query executed successfully, but returned no rows. --"
-            else:
-                # This path shouldn't be reached with current validation, but good practice
-                return "-- Query executed, but it was not a type that returns rows. --"
-
-        results = cursor.fetchall()
-        column_names = [desc[0] for desc in cursor.description]
-        logger.info("SQL query returned %d rows with columns: %s", len(results), column_names)
-
-        # Convert results to list of dictionaries
-        structured_results = [dict(zip(column_names, row)) for row in results]
-        logger.debug("Returning %d structured results for SQL query.", len(structured_results))
-        return structured_results
+def _validate_sql(sql: str) -> str:
+    """Validates a SQL query against the configured allowed statement types.
 
-    except InvalidInputError:
-        raise # Propagate our own validation errors
-    # Removed DatabaseConnectionError catch as connection is now passed in.
+    This is CPU-only work, so the async wrappers call it on the event loop before a DB
+    worker thread is taken.
+
+    Args:
+        sql: The SQL query string to validate.
+
+    Returns:
+        The statement type reported by sqlparse (e.g. 'SELECT').
+
+    Raises:
+        InvalidInputError: If the query is empty, has several statements, cannot be
+            parsed, or is of a type that is not allowed.
+    """
+    allowed_types = _allowed_sql_types()
+
+    # Fast reject: a disallowed statement keyword at the very start (e.g. "DROP ...")
+    # needs no tokenizing. Anything less obvious (WITH, leading comments, parentheses)
+    # falls through to sqlparse below, which also catches multi-statement input.
+    leading_keyword = _leading_keyword(sql)
+    if leading_keyword in _STATEMENT_KEYWORDS and leading_keyword not in allowed_types:
+        raise _not_allowed_error(leading_keyword, sql)
+
+    # Surrounding whitespace never changes the type, so it is left out of the cache
+    # key. Inner whitespace is kept as is: collapsing it could join a -- comment with
+    # the next line.
+    statement_type = _classify_sql(sql.strip())
+
+    # Allow only configured statement types
+    if statement_type not in allowed_types:
+        raise _not_allowed_error(statement_type, sql)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "SQL query validated as type: %s (Allowed: %s)",
+            statement_type,
+            _allowed_types_config()[2],
+        )
+    return statement_type
+
+_NO_ROWS_MESSAGE = "-- Query executed successfully, but returned no rows. --"
+
+def _no_result_set_message(statement_type: str) -> str:
+    """Returns the message for a statement that left no cursor description."""
+    # A SELECT that returned nothing vs. a type (DDL/DML) that never returns rows
+    if statement_type == 'SELECT':
+        return _NO_ROWS_MESSAGE
+    return "-- Query executed, but it was not a type that returns rows. --"
+
+def _execute_sql_sync(
+    conn: vastdb.api.VastSession, sql: str, statement_type: str
+) -> QueryResult:
+    """Synchronous helper to execute SQL query using an active VAST DB connection.
+
+    The query must already have been validated with `_validate_sql`.
+
+    Args:
+        conn: An active VAST DB session.
+        sql: The SQL query string to execute.
+        statement_type: The statement type returned by `_validate_sql`.
+
+    Returns:
+        A columnar result holding the query rows, or a string message for non-SELECT
+        queries or if no data is returned.
+    """
+    try:
+        with _borrow_cursor(conn) as cursor:
+            cursor.execute(sql) # Execute the original, validated SQL
+            _invalidate_caches_after(sql, statement_type)
+
+            # Check if the query was meant to return results (e.g., SELECT)
+            if cursor.description is None:
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info(
+                        "SQL query executed, but did not return results "
+                        "(e.g., non-SELECT or empty result)."
+                    )
+                return _no_result_set_message(statement_type)
+
+            results = cursor.fetchall()
+            if not results:
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("SQL query returned no rows.")
+                return _NO_ROWS_MESSAGE
+
+            column_names = _column_names(cursor.description)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "SQL query returned %d rows with columns: %s",
+                    len(results),
+                    column_names,
+                )
+            return ColumnarResult(columns=column_names, rows=results)
+
+    except DatabaseConnectionError:
+        raise # Propagate connection problems directly
     except Exception as e:
         # Catch errors during VAST DB execution (e.g., syntax errors VAST finds)
-        logger.error("Error executing SQL query in VAST DB: %s", e, exc_info=True)
+        _log_error("Error executing SQL query in VAST DB: %s", e)
         # Map VAST DB execution errors to QueryExecutionError
         raise QueryExecutionError(f"Error executing SQL query: {e}", original_exception=e)
     # finally block for closing connection is removed as it's managed by the lifespan.
 
+# --- Precomputed Metrics ---
+
+# Aggregate SELECTs registered up front (config.PRECOMPUTED_METRICS) are executed in the
+# background every config.METRIC_REFRESH_SECONDS by `run_metric_refresher`, and
+# execute_sql_query answers the identical SQL from the latest result instead of running
+# it. A write through this server (see `invalidate_result_cache`) makes every
+# precomputed result stale until its next refresh. Writes by other clients are not seen,
+# so a result older than config.METRIC_MAX_AGE_SECONDS is never served either.
+_metrics: Dict[str, str] = {} # Stripped SQL text -> metric name
+# Session -> {SQL: (data generation, time.monotonic() when computed, result)}
+_metric_results: (
+    "weakref.WeakKeyDictionary[Any, Dict[str, Tuple[int, float, QueryResult]]]"
+) = weakref.WeakKeyDictionary()
+
+def register_metric(name: str, sql: str) -> None:
+    """Registers a SELECT to be precomputed by `run_metric_refresher`.
+
+    Raises:
+        InvalidInputError: If `sql` is not a single allowed SELECT statement.
+    """
+    statement_type = _validate_sql(sql)
+    if statement_type != "SELECT":
+        raise InvalidInputError(
+            f"Metric '{name}' must be a SELECT query, not {statement_type}."
+        )
+    _metrics[sql.strip()] = name
+    logger.info("Registered precomputed metric '%s'.", name)
+
+def register_metrics(metrics: Dict[str, str]) -> int:
+    """Registers each `name -> SQL` entry, logging and skipping invalid ones.
+
+    Returns:
+        The number of metrics registered.
+    """
+    registered = 0
+    for name, sql in metrics.items():
+        try:
+            register_metric(name, sql)
+        except InvalidInputError as e:
+            logger.error("Skipping precomputed metric '%s': %s", name, e)
+            continue
+        registered += 1
+    return registered
+
+def _precomputed_result(
+    conn: vastdb.api.VastSession, sql: str
+) -> Optional[QueryResult]:
+    """Returns the current precomputed result for `sql` on `conn`, or None."""
+    if not _metric_results:
+        return None
+    results = _metric_results.get(conn)
+    entry = results.get(sql.strip()) if results is not None else None
+    if entry is None or entry[0] != _data_generation:
+        return None
+    if time.monotonic() - entry[1] > config.METRIC_MAX_AGE_SECONDS:
+        return None
+    return entry[2]
+
+async def refresh_metrics(conn: vastdb.api.VastSession) -> None:
+    """Executes every registered metric on `conn` and stores its result.
+
+    A metric that fails is logged and dropped until a later refresh succeeds, so callers
+    fall back to running the query themselves.
+    """
+    for sql, name in list(_metrics.items()):
+        generation = _data_generation
+        # Age counts from before the query, not from when it returned
+        started = time.monotonic()
+        try:
+            result = await _run_in_db_thread(_execute_sql_sync, conn, sql, "SELECT")
+        except VastMcpError as e:
+            logger.warning("Failed to refresh precomputed metric '%s': %s", name, e)
+            _metric_results.get(conn, {}).pop(sql, None)
+            continue
+        _metric_results.setdefault(conn, {})[sql] = (generation, started, result)
+
+async def run_metric_refresher(conn: vastdb.api.VastSession, interval: float) -> None:
+    """Refreshes the registered metrics every `interval` seconds until cancelled."""
+    while True:
+        await refresh_metrics(conn)
+        await asyncio.sleep(interval)
+
+# Identical SELECTs currently executing, keyed by (session id, data generation, SQL
+# text). Concurrent callers issuing the same read share one execution instead of each
+# queueing for the session lock and running it again. The generation keeps a SELECT
+# issued after a write from joining one that started before it.
+_inflight_selects: Dict[Tuple[int, int, str], "asyncio.Future[QueryResult]"] = {}
+
 async def execute_sql_query(conn: vastdb.api.VastSession, sql: str) -> QueryResult:
     """Executes a SQL query asynchronously using a provided VAST DB connection.
 
+    A SELECT that is identical to one already running on the same session is not
+    executed again; the caller receives the result of the running query. With
+    config.RESULT_CACHE_TTL set, a repeated SELECT is answered from the result cache
+    until the TTL expires or a write runs through this server.
+
     Args:
         conn: An active VAST DB session.
         sql: The SQL query string to execute.
 
     Returns:
-        A list of dictionaries representing query results, or a string message.
+        A columnar result holding the query rows, or a string message.
     """
-    logger.info("Received request to execute SQL query: %s...", sql[:100])
-    return await asyncio.to_thread(_execute_sql_sync, conn, sql)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Received request to execute SQL query: %s...", sql[:100])
+    statement_type = _validate_sql(sql)
+    if statement_type != "SELECT":
+        return await _run_in_db_thread(_execute_sql_sync, conn, sql, statement_type)
+
+    precomputed = _precomputed_result(conn, sql)
+    if precomputed is not None:
+        logger.debug("Returning precomputed metric result.")
+        return precomputed
+
+    cache = _result_cache_for(conn)
+    cache_key = (_data_generation, "select", sql)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Returning cached result for identical SELECT.")
+            return cached
+
+    key = (id(conn), _data_generation, sql)
+    running = _inflight_selects.get(key)
+    if running is not None:
+        logger.debug("Joining in-flight execution of an identical SELECT.")
+        # Shielded so cancelling one caller does not cancel the query for the others
+        return await asyncio.shield(running)
+
+    running = asyncio.ensure_future(
+        _run_in_db_thread(_execute_sql_sync, conn, sql, statement_type)
+    )
+    _inflight_selects[key] = running
+    try:
+        result = await asyncio.shield(running)
+        if cache is not None and _cacheable_result(result):
+            cache.set(cache_key, result)
+        return result
+    finally:
+        if _inflight_selects.get(key) is running:
+            del _inflight_selects[key]
+
+# --- Streaming Results ---
+
+# Rows per batch pulled with cursor.fetchmany() when streaming a result set.
+STREAM_BATCH_SIZE = max(1, config.FETCH_BATCH_SIZE)
+# Batches buffered between the DB thread and the consumer before the DB thread waits.
+_STREAM_QUEUE_SIZE = 4
+_STREAM_DONE = object()
+# Seconds a DB thread waits on a full queue before re-checking for the consumer.
+_STREAM_EMIT_POLL = 0.5
+
+def _put_from_thread(
+    queue: "asyncio.Queue[Any]",
+    item: Any,
+    loop: asyncio.AbstractEventLoop,
+    stop: threading.Event,
+) -> None:
+    """Puts `item` on `queue` from a DB thread, blocking while the queue is full.
+
+    Gives up instead of blocking forever once the consumer has set `stop` or the event
+    loop is closed or no longer running, so a DB thread (and with it the executor's
+    shutdown at exit) never hangs on a consumer that went away. After `stop` nothing is
+    delivered, not even `_STREAM_DONE`: the consumer waits for the producer itself
+    instead.
+    """
+    if stop.is_set() or loop.is_closed():
+        return
+    put = queue.put(item)
+    try:
+        future = asyncio.run_coroutine_threadsafe(put, loop)
+    except RuntimeError: # Event loop closed since the check above
+        put.close()
+        return
+    while True:
+        try:
+            future.result(timeout=_STREAM_EMIT_POLL)
+            return
+        except FutureTimeoutError:
+            if stop.is_set() or loop.is_closed() or not loop.is_running():
+                future.cancel()
+                return
+
+def _stream_query_sync(
+    conn: vastdb.api.VastSession,
+    sql: str,
+    batch_size: int,
+    emit: Callable[[Any], None],
+    stop: threading.Event,
+    statement_type: Optional[str] = None,
+) -> None:
+    """Executes `sql` and hands each batch of rows to `emit` as a columnar result.
+
+    Runs on a DB worker thread and holds the session until the result set is
+    exhausted or `stop` is set. A statement of a type other than SELECT that returns
+    no result set emits the same message `_execute_sql_sync` returns for it. Errors
+    are mapped to QueryExecutionError and emitted in place of a batch; `_STREAM_DONE`
+    is always emitted last.
+    """
+    try:
+        with _borrow_cursor(conn) as cursor:
+            _prepare_incremental_fetch(cursor, batch_size)
+            cursor.execute(sql)
+            _invalidate_caches_after(sql, statement_type)
+            if cursor.description is None:
+                if statement_type is not None and statement_type != "SELECT":
+                    emit(_no_result_set_message(statement_type))
+                return
+            column_names = _column_names(cursor.description)
+            while not stop.is_set():
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                emit(ColumnarResult(columns=column_names, rows=rows))
+    except DatabaseConnectionError as e:
+        emit(e)
+    except Exception as e:
+        _log_error("Error streaming SQL query results: %s", e)
+        emit(
+            QueryExecutionError(f"Error executing SQL query: {e}", original_exception=e)
+        )
+    finally:
+        emit(_STREAM_DONE)
+
+async def _stream_query(
+    conn: vastdb.api.VastSession,
+    sql: str,
+    batch_size: int,
+    statement_type: Optional[str] = None,
+) -> AsyncIterator[QueryResult]:
+    """Runs `sql` on a DB worker thread and yields its rows as columnar batches.
+
+    Only `_STREAM_QUEUE_SIZE` batches are buffered, so peak memory is bounded by the
+    batch size rather than the result size. Closing the generator early stops the fetch
+    and releases the session.
+    """
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=_STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def emit(item: Any) -> None:
+        # Blocks the DB thread while the queue is full, pacing fetches to the consumer
+        _put_from_thread(queue, item, loop, stop)
+
+    producer = loop.run_in_executor(
+        _DB_EXECUTOR,
+        _stream_query_sync,
+        conn,
+        sql,
+        batch_size,
+        emit,
+        stop,
+        statement_type,
+    )
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # With `stop` set the producer drops anything else it emits and returns once it
+        # has released the session. Emptying the queue lets a put it is already waiting
+        # on finish now rather than at its next poll. Nothing here waits on the queue,
+        # so cancelling this cleanup cannot strand the producer.
+        while not queue.empty():
+            queue.get_nowait()
+        await producer
+
+async def stream_sql_query(
+    conn: vastdb.api.VastSession, sql: str, batch_size: int = STREAM_BATCH_SIZE
+) -> AsyncIterator[QueryResult]:
+    """Executes a SQL query and yields its rows in batches rather than all at once.
+
+    The query is validated exactly like `execute_sql_query`. Each yielded batch is a
+    columnar result holding up to `batch_size` rows; a query that returns no rows
+    yields nothing, and a non-SELECT statement yields the single message
+    `execute_sql_query` would return.
+
+    Unlike `execute_sql_query`, every call runs the query: streamed SELECTs are not
+    answered from the result cache or a precomputed metric, and identical concurrent
+    SELECTs are not coalesced into one execution.
+
+    An open stream occupies one of the config.DB_THREAD_POOL_SIZE worker threads until
+    it is exhausted or closed, so that many slow consumers at once make every other
+    database request wait for a thread.
+
+    Args:
+        conn: An active VAST DB session.
+        sql: The SQL query string to execute.
+        batch_size: The maximum number of rows per batch.
+
+    Yields:
+        Columnar results, one per batch of rows, or a string message.
+    """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Received request to stream SQL query: %s...", sql[:100])
+    statement_type = _validate_sql(sql)
+    batches = _stream_query(conn, sql, batch_size, statement_type)
+    try:
+        async for batch in batches:
+            yield batch
+    finally:
+        await batches.aclose() # Stop the fetch promptly if our consumer stops early
+
+async def stream_table_sample(
+    conn: vastdb.api.VastSession,
+    table_name: str,
+    limit: int,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> AsyncIterator[ColumnarResult]:
+    """Fetches a sample of data from a table and yields it in batches.
+
+    Args:
+        conn: An active VAST DB session.
+        table_name: The name of the table to sample.
+        limit: The maximum number of rows to return.
+        batch_size: The maximum number of rows per batch.
+
+    Yields:
+        Columnar results, one per batch of rows.
+    """
+    _validate_table_name(table_name)
+    limit = _validate_limit(limit)
+    logger.info(
+        "Received request to stream table sample: table='%s', limit=%d",
+        table_name,
+        limit,
+    )
+    batches = _stream_query(
+        conn, _sample_sql(table_name, limit), min(batch_size, limit)
+    )
+    try:
+        async for batch in batches:
+            yield batch
+    finally:
+        await batches.aclose() # Stop the fetch promptly if our consumer stops early
+
+async def prefetch_tables_with_samples(
+    conn: vastdb.api.VastSession, limit: int = 10
+) -> Dict[str, Union[QueryResult, Exception]]:
+    """Lists all tables and fetches a sample from each of them concurrently.
+
+    Clients exploring a database typically list the tables and then sample each one in
+    turn. This composite fans the per-table samples out with `asyncio.gather`, bounded
+    by `config.SAMPLE_PREFETCH_CONCURRENCY`, instead of awaiting them one after another.
+
+    Args:
+        conn: An active VAST DB session.
+        limit: The maximum number of rows to return per table.
+
+    Returns:
+        A dictionary mapping each table name to its sample (as returned by
+        `get_table_sample`), or to the exception raised while sampling that table.
+    """
+    table_names = await list_tables(conn)
+    semaphore = asyncio.Semaphore(max(1, config.SAMPLE_PREFETCH_CONCURRENCY))
+
+    async def _sample(table_name: str) -> QueryResult:
+        async with semaphore:
+            return await get_table_sample(conn, table_name, limit)
+
+    samples = await asyncio.gather(
+        *(_sample(t) for t in table_names), return_exceptions=True
+    )
+    return dict(zip(table_names, samples))
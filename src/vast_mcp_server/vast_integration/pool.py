@@ -0,0 +1,189 @@
+"""A small pool of VAST DB sessions shared by the db_ops worker threads."""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _close_quietly(session: Any) -> None:
+    close = getattr(session, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception as e:
+            logger.debug("Ignoring error while closing pooled VAST DB session: %s", e)
+
+
+def _is_healthy(session: Any) -> bool:
+    """Runs a trivial query on `session`; False if it fails."""
+    try:
+        cursor = session.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            _close_quietly(cursor)
+        return True
+    except Exception as e:
+        logger.warning("Discarding VAST DB session that failed its health check: %s", e)
+        return False
+
+
+class SessionPool:
+    """Hands out VAST DB sessions so concurrent requests each get their own.
+
+    A DB-API session must not be driven from several threads at once. With a single
+    shared session every request queues behind one lock; with a pool, up to `max_size`
+    requests run in parallel and each reuses an already-connected session instead of
+    paying the connect handshake again.
+
+    Sessions are created lazily by `factory` (e.g. a `vastdb.connect` call) up to
+    `max_size`. Idle sessions are reused most-recently-used first. Sessions idle for
+    longer than `idle_ttl` seconds are closed on the next `acquire` (0 or less keeps
+    them forever). A session whose use raised an exception gets a `SELECT 1` health
+    check before it is returned, so a failed query does not cost a connection but a
+    broken one is closed instead of being handed to the next request. Successful uses
+    are not re-checked.
+
+    Idle sessions can be dropped by the server or a load balancer without notice. With
+    `stale_after` set, a session idle for that long is health-checked before `acquire`
+    hands it out and replaced if the check fails. `ping_idle` does the same in the
+    background, so the reconnect happens between requests instead of during one.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_size: int, idle_ttl: float = 0,
+                 timer: Callable[[], float] = time.monotonic, stale_after: float = 0):
+        self.max_size = max(1, max_size)
+        self.idle_ttl = idle_ttl
+        self.stale_after = stale_after
+        self._factory = factory
+        self._timer = timer
+        # (released_at, session), most recent last
+        self._idle: List[Tuple[float, Any]] = []
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _take_idle(self) -> Optional[Tuple[float, Any]]:
+        """Pops the newest live (released_at, session); closes expired ones."""
+        with self._lock:
+            if self.idle_ttl > 0:
+                cutoff = self._timer() - self.idle_ttl
+                expired = [
+                    session
+                    for released_at, session in self._idle
+                    if released_at <= cutoff
+                ]
+                self._idle = [entry for entry in self._idle if entry[0] > cutoff]
+            else:
+                expired = []
+            entry = self._idle.pop() if self._idle else None
+        for stale in expired:
+            logger.debug(
+                "Closing VAST DB session idle for more than %s seconds.", self.idle_ttl
+            )
+            _close_quietly(stale)
+        return entry
+
+    def _is_stale(self, released_at: float) -> bool:
+        return self.stale_after > 0 and self._timer() - released_at >= self.stale_after
+
+    def warm(self) -> None:
+        """Opens one session up front so connection problems surface at startup."""
+        with self.acquire():
+            pass
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """Yields a session for exclusive use, blocking while all are checked out.
+
+        Raises:
+            RuntimeError: If the pool has been closed.
+            Exception: Whatever `factory` raises when a new session cannot be opened.
+        """
+        if self._closed:
+            raise RuntimeError("VAST DB session pool is closed.")
+        self._slots.acquire()
+        try:
+            entry = self._take_idle()
+            session = None
+            if entry is not None:
+                released_at, session = entry
+                if self._is_stale(released_at) and not _is_healthy(session):
+                    _close_quietly(session)
+                    session = None
+            if session is None:
+                session = self._factory()
+        except BaseException:
+            self._slots.release()
+            raise
+        healthy = True
+        try:
+            yield session
+        except Exception:
+            healthy = _is_healthy(session)
+            raise
+        except BaseException:
+            healthy = False # Cancelled mid-call: the session state is unknown
+            raise
+        finally:
+            with self._lock:
+                keep = healthy and not self._closed
+                if keep:
+                    self._idle.append((self._timer(), session))
+            if not keep:
+                _close_quietly(session)
+            self._slots.release()
+
+    def ping_idle(self, older_than: float) -> int:
+        """Health-checks every idle session unused for at least `older_than` seconds.
+
+        Sessions that pass go back to the idle list (keeping their idle time, so
+        `idle_ttl` still applies); sessions that fail are closed. A session being
+        checked counts against `max_size`, so the check stops early rather than wait
+        while the pool is fully checked out.
+
+        Returns:
+            The number of sessions closed.
+        """
+        cutoff = self._timer() - older_than
+        with self._lock:
+            due = [entry for entry in self._idle if entry[0] <= cutoff]
+        closed = 0
+        for entry in due:
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                with self._lock:
+                    if entry not in self._idle:
+                        continue # Handed out or expired since the list was taken
+                    self._idle.remove(entry)
+                healthy = _is_healthy(entry[1])
+                with self._lock:
+                    keep = healthy and not self._closed
+                    if keep:
+                        self._idle.append(entry)
+                        self._idle.sort(key=lambda idle_entry: idle_entry[0])
+                if not keep:
+                    _close_quietly(entry[1])
+                if not healthy:
+                    closed += 1
+            finally:
+                self._slots.release()
+        return closed
+
+    def close(self) -> None:
+        """Closes idle sessions; checked-out ones are closed when released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for _, session in idle:
+            _close_quietly(session)
+
+    def __len__(self) -> int:
+        """Number of idle sessions currently held."""
+        with self._lock:
+            return len(self._idle)
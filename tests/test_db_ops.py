@@ -1,11 +1,22 @@
 import pytest
-from unittest.mock import MagicMock, patch
-import csv
-import io
+from unittest.mock import MagicMock, Mock, call, patch
+import asyncio
+import re
+import threading
+import weakref
+import sqlparse
+from types import SimpleNamespace
 
 # Since we configured pythonpath = ["src"] in pyproject.toml,
 # we can import directly from vast_mcp_server
 from vast_mcp_server.vast_integration import db_ops
+from vast_mcp_server.vast_integration.db_ops import (
+    execute_sql_query,
+    get_db_schema,
+    get_table_sample,
+    list_tables,
+)
+from vast_mcp_server.vast_integration.pool import SessionPool
 from vast_mcp_server import config
 # Import custom exceptions to test for them
 from vast_mcp_server.exceptions import (
@@ -16,44 +27,362 @@ from vast_mcp_server.exceptions import (
     InvalidInputError
 )
 
-# Mark all tests in this file as asyncio
-pytestmark = pytest.mark.asyncio
+# asyncio_mode = "auto" (pyproject.toml) runs the async tests on the event loop; tests
+# that never await are plain functions so pytest-asyncio leaves them alone.
+
+
+@pytest.fixture(autouse=True)
+def _clear_sql_classification_cache():
+    """Keep cached sqlparse classifications from leaking between tests."""
+    db_ops._classify_sql.cache_clear()
+    yield
+    db_ops._classify_sql.cache_clear()
+
 
+# The DB-API surface db_ops touches. Spec'd Mocks skip MagicMock's magic-method
+# setup and raise on any attribute outside it, so a typo in a test fails instead
+# of passing silently.
+_CURSOR_SPEC = ['execute', 'fetchall', 'fetchmany', 'description', 'arraysize', 'close']
+_CONN_SPEC = ['cursor', 'close']
+
+# Driver errors raised by the mocked cursors, built once and shared by every test.
+_NO_CATALOG_ERR = Exception("information_schema not supported")
+_DESCRIBE_ERR = Exception("Describe permission denied")
+_CONNECTION_RESET_ERR = Exception("connection reset by peer")
+_SYNTAX_ERR = Exception("VAST DB Syntax Error near 'FROM'")
+
+# Passed where a request must be rejected before any session is used: it has no
+# cursor(), so a test fails loudly if the operation ever reaches the database.
+_UNUSED_CONN = object()
 
 # Helper to create mock connection and cursor
 def _get_mock_conn_and_cursor():
-    mock_cursor = MagicMock()
-    mock_conn = MagicMock()
+    mock_cursor = Mock(spec=_CURSOR_SPEC)
+    mock_conn = Mock(spec=_CONN_SPEC)
     mock_conn.cursor.return_value = mock_cursor
     return mock_conn, mock_cursor
 
+class FakeCursor:
+    """A DB-API cursor stand-in that serves canned results by SQL text, Mock-free.
+
+    `results` maps a statement to the rows it returns or the exception execute()
+    raises; statements not listed return no rows. Executed statements are
+    recorded in `executed`.
+    """
+    __slots__ = ("results", "executed", "description", "arraysize", "_rows")
+
+    def __init__(self, results, description=None):
+        self.results = results
+        self.executed = []
+        self.description = description
+        self.arraysize = 1
+        self._rows = []
+
+    def execute(self, sql):
+        self.executed.append(sql)
+        result = self.results.get(sql, ())
+        if isinstance(result, Exception):
+            raise result
+        self._rows = list(result)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+class FakeConn:
+    """A session whose cursor() always returns the same FakeCursor."""
+    # db_ops keys per-session caches weakly
+    __slots__ = ("cursor_obj", "closed", "__weakref__")
+
+    def __init__(self, cursor):
+        self.cursor_obj = cursor
+        self.closed = False
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def close(self):
+        self.closed = True
+
+class BarrierFakeCursor(FakeCursor):
+    """A FakeCursor whose execute() of any SQL in `blocking` waits on `barrier` first.
+
+    Used to prove statements run concurrently: the barrier only opens once every party
+    is inside execute() at the same time.
+    """
+    __slots__ = ("barrier", "blocking")
+
+    def __init__(self, results, barrier, blocking, description=None):
+        super().__init__(results, description)
+        self.barrier = barrier
+        self.blocking = blocking
+
+    def execute(self, sql):
+        if sql in self.blocking:
+            self.barrier.wait()
+        super().execute(sql)
+
+def _fake_session(results):
+    """Returns a (FakeConn, FakeCursor) pair serving `results`."""
+    cursor = FakeCursor(results)
+    return FakeConn(cursor), cursor
+
+def _prime(cursor, description, *, fetchall=None, fetchmany=None):
+    """Sets a mock cursor's description and its fetchall()/fetchmany() rows."""
+    cursor.description = description
+    if fetchall is not None:
+        cursor.fetchall.return_value = fetchall
+    if fetchmany is not None:
+        cursor.fetchmany.return_value = fetchmany
+
+@pytest.fixture
+def empty_db():
+    """A fake session (`.conn`, `.cursor`) on which every statement returns no rows."""
+    conn, cursor = _fake_session({})
+    return SimpleNamespace(conn=conn, cursor=cursor)
+
+# Change config only through monkeypatch (or allow_only below), never by assignment:
+# tests must stay independent for `pytest -n auto`, where a setting leaked by one test
+# would fail whichever unrelated test its worker happens to run next.
+@pytest.fixture
+def allow_only(monkeypatch):
+    """Call with the statement types config.ALLOWED_SQL_TYPES permits in this test."""
+    def _apply(*types):
+        monkeypatch.setattr(config, 'ALLOWED_SQL_TYPES', list(types))
+    return _apply
+
+@pytest.fixture
+def mock_db():
+    """A mocked session (`.conn`) whose cursor() returns `.cursor`."""
+    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
+    return SimpleNamespace(conn=mock_conn, cursor=mock_cursor)
+
 
 # --- Tests for create_vast_connection --- #
 # These tests are removed as create_vast_connection is removed.
 
+# --- Tests for SessionPool access --- #
+
+async def test_pooled_queries_run_on_separate_sessions():
+    """Test concurrent queries through a SessionPool each get a session of their own."""
+    # Arrange
+    both_started = threading.Barrier(2, timeout=5)
+    sessions = []
+
+    def make_session():
+        mock_conn, mock_cursor = _get_mock_conn_and_cursor()
+        mock_cursor.execute.side_effect = lambda sql: both_started.wait()
+        mock_cursor.description = [('x',)]
+        mock_cursor.fetchall.return_value = [(1,)]
+        sessions.append(mock_conn)
+        return mock_conn
+
+    pool = SessionPool(make_session, max_size=2)
+
+    # Act
+    results = await asyncio.gather(
+        execute_sql_query(pool, "SELECT 1 AS x"),
+        execute_sql_query(pool, "SELECT 2 AS x"),
+    )
+
+    # Assert
+    assert results == [{'columns': ['x'], 'rows': [(1,)]}] * 2
+    assert len(sessions) == 2 # Both queries were inside execute() at the same time
+    assert len(pool) == 2
+
+async def test_pool_keeps_session_after_query_error_if_healthy(mock_db):
+    """Test a failed query keeps its session pooled when the health check passes."""
+    # Arrange
+    mock_db.cursor.execute.side_effect = [Exception("Column 'bad' not found"), None]
+    pool = SessionPool(lambda: mock_db.conn, max_size=1)
+
+    # Act
+    with pytest.raises(QueryExecutionError):
+        await execute_sql_query(pool, "SELECT bad FROM t")
+
+    # Assert
+    assert mock_db.cursor.execute.call_args_list == [
+        call("SELECT bad FROM t"),
+        call("SELECT 1"),
+    ]
+    assert len(pool) == 1
+    mock_db.conn.close.assert_not_called()
+
+async def test_pool_discards_broken_session():
+    """Test a session that fails its health check is closed and later replaced."""
+    # Arrange
+    broken_conn, _ = _fake_session(
+        {"SELECT 1 AS x": _CONNECTION_RESET_ERR, "SELECT 1": _CONNECTION_RESET_ERR}
+    )
+    fresh_conn, fresh_cursor = _fake_session({"SELECT 1 AS x": [(1,)]})
+    fresh_cursor.description = [('x',)]
+    pool = SessionPool(iter([broken_conn, fresh_conn]).__next__, max_size=1)
+
+    # Act
+    with pytest.raises(QueryExecutionError):
+        await execute_sql_query(pool, "SELECT 1 AS x")
+    result = await execute_sql_query(pool, "SELECT 1 AS x")
+
+    # Assert
+    assert broken_conn.closed
+    assert result == {'columns': ['x'], 'rows': [(1,)]}
+
+def test_pool_closes_sessions_idle_past_ttl():
+    """Test an idle session older than idle_ttl is closed instead of reused."""
+    # Arrange
+    now = [0.0]
+    old_conn, _ = _fake_session({})
+    new_conn, _ = _fake_session({})
+    pool = SessionPool(
+        iter([old_conn, new_conn]).__next__,
+        max_size=1,
+        idle_ttl=60,
+        timer=lambda: now[0],
+    )
+    pool.warm()
+    now[0] = 61.0
+
+    # Act
+    with pool.acquire() as session:
+        pass
+
+    # Assert
+    assert session is new_conn
+    assert old_conn.closed
+
+def test_pool_ping_idle_replaces_dropped_sessions():
+    """Test the heartbeat closes idle sessions failing SELECT 1 and keeps the rest."""
+    # Arrange
+    now = [0.0]
+    dropped_conn, _ = _fake_session({"SELECT 1": _CONNECTION_RESET_ERR})
+    live_conn, live_cursor = _fake_session({})
+    pool = SessionPool(
+        iter([dropped_conn, live_conn]).__next__, max_size=2, timer=lambda: now[0]
+    )
+    with pool.acquire(), pool.acquire():
+        pass
+    now[0] = 61.0
+
+    # Act
+    closed = pool.ping_idle(60)
+
+    # Assert
+    assert closed == 1
+    assert dropped_conn.closed
+    assert live_cursor.executed == ["SELECT 1"]
+    with pool.acquire() as session:
+        assert session is live_conn
+
+def test_pool_checks_stale_session_on_acquire():
+    """Test a session idle past stale_after is checked and replaced if dropped."""
+    # Arrange
+    now = [0.0]
+    dropped_conn, _ = _fake_session({"SELECT 1": _CONNECTION_RESET_ERR})
+    new_conn, _ = _fake_session({})
+    pool = SessionPool(iter([dropped_conn, new_conn]).__next__, max_size=1,
+                       timer=lambda: now[0], stale_after=30)
+    pool.warm()
+    now[0] = 31.0
+
+    # Act
+    with pool.acquire() as session:
+        pass
+
+    # Assert
+    assert session is new_conn
+    assert dropped_conn.closed
+
 # --- Tests for get_db_schema --- #
 
-async def test_get_db_schema_success(mocker):
-    """Test successful schema fetching with multiple tables."""
+# SQL -> rows (or raised exception) for the SHOW TABLES / DESCRIBE fallback tests.
+_SCHEMA_RESULTS_OK = {
+    db_ops._CATALOG_COLUMNS_SQL: _NO_CATALOG_ERR,
+    "SHOW TABLES": [('table1',), ('table2',)],
+    "DESCRIBE TABLE table1": [('col1', 'INT', ...), ('col2', 'VARCHAR', ...)],
+    "DESCRIBE TABLE table2": [('id', 'BIGINT', ...), ('data', 'TEXT', ...)],
+}
+_SCHEMA_RESULTS_DESCRIBE_ERR = {
+    db_ops._CATALOG_COLUMNS_SQL: _NO_CATALOG_ERR,
+    "SHOW TABLES": [('table1',), ('sensitive_table',)],
+    "DESCRIBE TABLE table1": [('col1', 'INT', ...)],
+    "DESCRIBE TABLE sensitive_table": _DESCRIBE_ERR,
+}
+# A catalog that answers the information_schema query with a single one-column table.
+_CATALOG_RESULTS_ONE_TABLE = {db_ops._CATALOG_COLUMNS_SQL: [('table1', 'col1', 'INT')]}
+
+# Expected get_db_schema output for the results above.
+_EXPECTED_SCHEMA_OK = (
+    "TABLE: table1\n"
+    "  - col1 (INT)\n"
+    "  - col2 (VARCHAR)\n"
+    "\n"
+    "TABLE: table2\n"
+    "  - id (BIGINT)\n"
+    "  - data (TEXT)\n"
+    "\n"
+)
+_EXPECTED_SCHEMA_DESCRIBE_ERR = (
+    "TABLE: table1\n"
+    "  - col1 (INT)\n"
+    "\n"
+    "TABLE: sensitive_table\n"
+    "  - !!! Error describing table: {err} !!!\n"
+    "\n"
+)
+
+async def test_get_db_schema_success():
+    """Test schema fetching with multiple tables via SHOW TABLES / DESCRIBE."""
     # Arrange
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
+    conn, cursor = _fake_session(_SCHEMA_RESULTS_OK)
 
-    # Configure cursor mock return values based on expected calls
-    def execute_side_effect(sql):
-        if sql == "SHOW TABLES":
-            mock_cursor.fetchall.return_value = [('table1',), ('table2',)]
-        elif sql == "DESCRIBE TABLE table1":
-            mock_cursor.fetchall.return_value = [('col1', 'INT', ...), ('col2', 'VARCHAR', ...)]
-        elif sql == "DESCRIBE TABLE table2":
-            mock_cursor.fetchall.return_value = [('id', 'BIGINT', ...), ('data', 'TEXT', ...)]
-        else:
-            mock_cursor.fetchall.return_value = [] # Default empty for unexpected calls
-        return None # execute itself doesn't return anything
+    # Act
+    schema_output = await get_db_schema(conn)
 
-    mock_cursor.execute.side_effect = execute_side_effect
+    # Assert
+    assert schema_output == _EXPECTED_SCHEMA_OK
+    assert len(cursor.executed) == 4 # catalog attempt + SHOW TABLES + 2 DESCRIBE
+    assert not conn.closed # The session belongs to the lifespan, not db_ops
 
+async def test_get_db_schema_no_tables(empty_db):
+    """Test schema fetching when no tables are found."""
     # Act
-    schema_output = await db_ops.get_db_schema(mock_conn)
+    schema_output = await get_db_schema(empty_db.conn)
+
+    # Assert
+    assert schema_output == "-- No tables found in the database. --"
+    assert empty_db.cursor.executed == [db_ops._CATALOG_COLUMNS_SQL, "SHOW TABLES"]
+
+async def test_get_db_schema_describe_error_returns_partial():
+    """Test schema fetch still returns partial schema even if describe fails."""
+    # Arrange
+    conn, cursor = _fake_session(_SCHEMA_RESULTS_DESCRIBE_ERR)
+
+    # Act
+    schema_output = await get_db_schema(conn)
+
+    # Assert - Check that the error message is embedded in the output
+    assert schema_output == _EXPECTED_SCHEMA_DESCRIBE_ERR.format(err=_DESCRIBE_ERR)
+    assert len(cursor.executed) == 4
+
+async def test_get_db_schema_from_information_schema():
+    """Test the schema is built from one information_schema query when available."""
+    # Arrange
+    conn, cursor = _fake_session({db_ops._CATALOG_COLUMNS_SQL: [
+        ('table1', 'col1', 'INT'),
+        ('table1', 'col2', 'VARCHAR'),
+        ('table2', 'id', 'BIGINT'),
+    ]})
+
+    # Act
+    schema_output = await get_db_schema(conn)
 
     # Assert
     expected_output = (
@@ -63,395 +392,1283 @@ async def test_get_db_schema_success(mocker):
         "\n"
         "TABLE: table2\n"
         "  - id (BIGINT)\n"
-        "  - data (TEXT)\n"
         "\n"
     )
     assert schema_output == expected_output
-    assert mock_cursor.execute.call_count == 3 # SHOW TABLES + 2 DESCRIBE
-    # mock_conn.close() is no longer called by db_ops
+    assert cursor.executed == [db_ops._CATALOG_COLUMNS_SQL]
 
-async def test_get_db_schema_no_tables(mocker):
-    """Test schema fetching when no tables are found."""
+async def test_get_db_schema_remembers_missing_information_schema():
+    """Test a session whose catalog query failed skips it on later schema fetches."""
     # Arrange
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.execute.side_effect = lambda sql: None # Just need execute to run
-    mock_cursor.fetchall.return_value = [] # SHOW TABLES returns empty list
+    conn, cursor = _fake_session({
+        db_ops._CATALOG_COLUMNS_SQL: _NO_CATALOG_ERR,
+        "SHOW TABLES": [('table1',)],
+        "DESCRIBE TABLE table1": [('col1', 'INT')],
+    })
 
     # Act
-    schema_output = await db_ops.get_db_schema(mock_conn)
+    await get_db_schema(conn)
+    db_ops.invalidate_schema_cache() # Bypass the schema cache for the second fetch
+    cursor.executed.clear()
+    await get_db_schema(conn)
 
     # Assert
-    assert schema_output == "-- No tables found in the database. --"
-    mock_cursor.execute.assert_called_once_with("SHOW TABLES")
-    # mock_conn.close() is no longer called by db_ops
+    assert cursor.executed == ["SHOW TABLES", "DESCRIBE TABLE table1"]
 
-async def test_get_db_schema_describe_error_returns_partial(mocker):
-    """Test schema fetch still returns partial schema even if describe fails."""
+async def test_get_db_schema_skips_catalog_when_disabled(monkeypatch):
+    """Test MCP_USE_INFO_SCHEMA=false goes straight to SHOW TABLES / DESCRIBE."""
     # Arrange
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    describe_exception = Exception("Describe permission denied")
+    monkeypatch.setattr(config, "USE_INFO_SCHEMA", False)
+    conn, cursor = _fake_session(
+        {"SHOW TABLES": [('table1',)], "DESCRIBE TABLE table1": [('col1', 'INT')]}
+    )
+
+    # Act
+    schema = await get_db_schema(conn)
 
-    def execute_side_effect(sql):
-        if sql == "SHOW TABLES":
-            mock_cursor.fetchall.return_value = [('table1',), ('sensitive_table',)]
-        elif sql == "DESCRIBE TABLE table1":
-            mock_cursor.fetchall.return_value = [('col1', 'INT', ...)]
-        elif sql == "DESCRIBE TABLE sensitive_table":
-            raise describe_exception # Error describing this table
-        else:
-            mock_cursor.fetchall.return_value = []
-        return None
+    # Assert
+    assert schema == "TABLE: table1\n  - col1 (INT)\n\n"
+    assert cursor.executed == ["SHOW TABLES", "DESCRIBE TABLE table1"]
 
-    mock_cursor.execute.side_effect = execute_side_effect
+async def test_get_db_schema_pool_without_catalog_borrows_only_for_queries(monkeypatch):
+    """Test a pooled fetch that will not use the catalog checks out no session."""
+    # Arrange
+    monkeypatch.setattr(config, "USE_INFO_SCHEMA", False)
+    results = {"SHOW TABLES": [('table1',)], "DESCRIBE TABLE table1": [('col1', 'INT')]}
+    pool = SessionPool(lambda: FakeConn(FakeCursor(results)), max_size=2)
 
     # Act
-    schema_output = await db_ops.get_db_schema(mock_conn)
+    with patch.object(
+        db_ops, "_borrow_cursor", wraps=db_ops._borrow_cursor
+    ) as borrow_spy:
+        schema = await get_db_schema(pool)
 
-    # Assert - Check that the error message is embedded in the output
-    expected_output = (
-        "TABLE: table1\n"
-        "  - col1 (INT)\n"
-        "\n"
-        "TABLE: sensitive_table\n"
-        f"  - !!! Error describing table: {describe_exception} !!!\n"
-        "\n"
+    # Assert
+    assert schema == "TABLE: table1\n  - col1 (INT)\n\n"
+    assert borrow_spy.call_count == 2 # SHOW TABLES and one DESCRIBE
+
+async def test_get_db_schema_cached_second_call_skips_db():
+    """Test a repeated schema fetch is served from the cache without touching the DB."""
+    # Arrange
+    conn, cursor = _fake_session(_CATALOG_RESULTS_ONE_TABLE)
+
+    # Act
+    first = await get_db_schema(conn)
+    second = await get_db_schema(conn)
+
+    # Assert
+    assert second == first
+    assert cursor.executed == [db_ops._CATALOG_COLUMNS_SQL]
+
+async def test_warm_schema_cache_serves_first_request_from_cache():
+    """Test the startup warmup fetches the schema before the first request."""
+    # Arrange
+    conn, cursor = _fake_session(_CATALOG_RESULTS_ONE_TABLE)
+
+    # Act
+    await db_ops.warm_schema_cache(conn)
+    schema = await get_db_schema(conn)
+
+    # Assert
+    assert schema == "TABLE: table1\n  - col1 (INT)\n\n"
+    assert cursor.executed == [db_ops._CATALOG_COLUMNS_SQL]
+
+@patch.object(db_ops.logger, 'warning')
+async def test_warm_schema_cache_logs_failure_without_raising(
+    mock_log_warning, mock_db
+):
+    """Test a failed warmup is logged and left for the first request to retry."""
+    # Arrange
+    mock_db.cursor.execute.side_effect = Exception("endpoint unavailable")
+
+    # Act
+    await db_ops.warm_schema_cache(mock_db.conn)
+
+    # Assert
+    assert any(
+        "Schema warmup failed" in c.args[0] for c in mock_log_warning.call_args_list
     )
-    assert schema_output == expected_output
-    assert mock_cursor.execute.call_count == 3
-    # mock_conn.close() is no longer called by db_ops
 
-async def test_get_db_schema_show_tables_error_raises(mocker):
-    """Test error during SHOW TABLES raises SchemaFetchError."""
+async def test_get_db_schema_cache_invalidated_by_ddl(allow_only):
+    """Test DDL through execute_sql_query forces the next schema fetch to hit the DB."""
     # Arrange
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    original_exception = Exception("Cannot list tables")
-    mock_cursor.execute.side_effect = original_exception
+    allow_only("SELECT", "DROP")
+    conn, cursor = _fake_session(_CATALOG_RESULTS_ONE_TABLE)
+    await get_db_schema(conn)
+    await execute_sql_query(conn, "DROP TABLE table2")
+    cursor.executed.clear()
 
-    # Act & Assert
-    with pytest.raises(SchemaFetchError) as excinfo:
-        await db_ops.get_db_schema(mock_conn)
+    # Act
+    await get_db_schema(conn)
 
-    assert "Error fetching schema" in str(excinfo.value)
-    assert excinfo.value.original_exception is original_exception
-    mock_cursor.execute.assert_called_once_with("SHOW TABLES")
-    # mock_conn.close() is no longer called by db_ops
+    # Assert
+    assert cursor.executed == [db_ops._CATALOG_COLUMNS_SQL]
 
-async def test_get_db_schema_invalid_connection_raises(mocker):
-    """Test invalid connection (e.g., None) raises DatabaseConnectionError."""
+async def test_get_db_schema_cache_invalidated_by_streamed_ddl(allow_only):
+    """Test DDL executed through stream_sql_query also invalidates the schema cache."""
     # Arrange
-    mock_conn = None # Simulate a bad connection from context
+    allow_only("SELECT", "DROP")
+    conn, cursor = _fake_session(_CATALOG_RESULTS_ONE_TABLE)
+    await get_db_schema(conn)
+    assert [
+        batch async for batch in db_ops.stream_sql_query(conn, "DROP TABLE table2")
+    ] == ["-- Query executed, but it was not a type that returns rows. --"]
+    cursor.executed.clear()
 
-    # Act & Assert
-    with pytest.raises(DatabaseConnectionError) as excinfo:
-        await db_ops.get_db_schema(mock_conn)
-    assert "Provided database connection is invalid" in str(excinfo.value)
+    # Act
+    await get_db_schema(conn)
+
+    # Assert
+    assert cursor.executed == [db_ops._CATALOG_COLUMNS_SQL]
 
+async def test_get_db_schema_partial_result_not_cached():
+    """Test a schema with describe errors is fetched again on the next call."""
+    # Arrange
+    conn, cursor = _fake_session({
+        db_ops._CATALOG_COLUMNS_SQL: _NO_CATALOG_ERR,
+        "SHOW TABLES": [('table1',)],
+        "DESCRIBE TABLE table1": _DESCRIBE_ERR,
+    })
+    await get_db_schema(conn)
+    cursor.executed.clear()
+
+    # Act
+    await get_db_schema(conn)
+
+    # Assert
+    assert cursor.executed == ["DESCRIBE TABLE table1"] # The table list is still cached
+
+async def test_get_db_schema_describes_tables_concurrently_with_pool(monkeypatch):
+    """Test the DESCRIBE fallback runs tables in parallel, keeping table order."""
+    # Arrange
+    monkeypatch.setattr(config, "SCHEMA_DESCRIBE_CONCURRENCY", 2)
+    describes_overlap = threading.Barrier(2, timeout=5)
+    results = {
+        db_ops._CATALOG_COLUMNS_SQL: _NO_CATALOG_ERR,
+        "SHOW TABLES": [('table1',), ('table2',), ('table3',)],
+        "DESCRIBE TABLE table1": [('id', 'INT')],
+        "DESCRIBE TABLE table2": [('id', 'INT')],
+        "DESCRIBE TABLE table3": _DESCRIBE_ERR,
+    }
+    # Only passes if both DESCRIBEs run at the same time
+    blocking = {"DESCRIBE TABLE table1", "DESCRIBE TABLE table2"}
+    pool = SessionPool(
+        lambda: FakeConn(BarrierFakeCursor(results, describes_overlap, blocking)),
+        max_size=2,
+    )
+
+    # Act
+    schema = await get_db_schema(pool)
+
+    # Assert
+    assert schema == (
+        "TABLE: table1\n  - id (INT)\n\n"
+        "TABLE: table2\n  - id (INT)\n\n"
+        "TABLE: table3\n"
+        "  - !!! Error describing table: Describe permission denied !!!\n\n"
+    )
+
+async def test_get_table_metadata_reuses_describe_from_schema_fetch():
+    """Test metadata reuses the DESCRIBE results of an earlier schema fetch."""
+    # Arrange
+    conn, cursor = _fake_session({
+        db_ops._CATALOG_COLUMNS_SQL: _NO_CATALOG_ERR,
+        "SHOW TABLES": [('table1',)],
+        "DESCRIBE TABLE table1": [('col1', 'INT', 'NO')],
+    })
+    await get_db_schema(conn)
+    cursor.executed.clear()
+
+    # Act
+    metadata = await db_ops.get_table_metadata(conn, "table1")
+
+    # Assert
+    assert metadata == {
+        "table_name": "table1",
+        "columns": [
+            {
+                "name": "col1",
+                "type": "INT",
+                "is_nullable": "NO",
+                "key": None,
+                "default": None,
+            }
+        ],
+    }
+    assert cursor.executed == []
+
+async def test_table_ddl_invalidates_only_that_tables_metadata(allow_only):
+    """Test ALTER TABLE on one table re-describes it while other tables stay cached."""
+    # Arrange
+    allow_only("SELECT", "ALTER")
+    conn, cursor = _fake_session({
+        "DESCRIBE TABLE table1": [('col1', 'INT', 'NO')],
+        "DESCRIBE TABLE table2": [('col1', 'INT', 'NO')],
+    })
+    await db_ops.get_table_metadata(conn, "table1")
+    await db_ops.get_table_metadata(conn, "table2")
+    await execute_sql_query(conn, "ALTER TABLE table1 ADD COLUMN col2 INT")
+    cursor.executed.clear()
+
+    # Act
+    await db_ops.get_table_metadata(conn, "table1")
+    await db_ops.get_table_metadata(conn, "table2")
+
+    # Assert
+    assert cursor.executed == ["DESCRIBE TABLE table1"]
+
+async def test_table_ddl_invalidates_metadata_cached_under_other_case(allow_only):
+    """Test DDL on "Users" re-describes the table when later looked up as "users"."""
+    # Arrange
+    allow_only("SELECT", "ALTER")
+    conn, cursor = _fake_session({"DESCRIBE TABLE users": [('col1', 'INT', 'NO')]})
+    await db_ops.get_table_metadata(conn, "users")
+    await execute_sql_query(conn, "ALTER TABLE Users ADD COLUMN col2 INT")
+    cursor.executed.clear()
+
+    # Act
+    await db_ops.get_table_metadata(conn, "users")
+
+    # Assert
+    assert cursor.executed == ["DESCRIBE TABLE users"]
+
+@pytest.mark.parametrize("sql, expected_table", [
+    ("ALTER TABLE orders ADD COLUMN note VARCHAR", "orders"),
+    ("drop table if exists orders;", "orders"),
+    ("/* cleanup */ DROP TABLE orders", "orders"),
+    ("CREATE TABLE IF NOT EXISTS orders (id INT)", "orders"),
+    ("CREATE OR REPLACE TABLE orders AS SELECT 1", "orders"),
+    ("DROP TABLE orders, customers", None),
+    ("DROP TABLE sales.orders", None),
+    ("ALTER TABLE orders RENAME TO old_orders", None),
+    ("CREATE VIEW v AS SELECT 1", None),
+])
+@patch.object(db_ops, "invalidate_schema_cache")
+def test_invalidate_after_ddl_scope(mock_invalidate, sql, expected_table):
+    """Test single-table DDL invalidates only that table; other DDL invalidates all."""
+
+    db_ops._invalidate_after_ddl(sql, "DROP")
+
+    if expected_table is None:
+        mock_invalidate.assert_called_once_with()
+    else:
+        mock_invalidate.assert_called_once_with(expected_table)
+
+@patch.object(db_ops, "invalidate_schema_cache")
+def test_invalidate_after_ddl_ignores_non_ddl(mock_invalidate):
+    """Test queries that cannot change a table definition keep the schema cache."""
+
+    db_ops._invalidate_after_ddl("INSERT INTO orders VALUES (1)", "INSERT")
+
+    mock_invalidate.assert_not_called()
+
+def test_table_generations_are_bounded(monkeypatch):
+    """Test per-table DDL past the cap invalidates everything instead of tracking it."""
+    # Arrange
+    monkeypatch.setattr(db_ops, "_SCHEMA_CACHE_MAXSIZE", 2)
+    monkeypatch.setattr(db_ops, "_table_generations", {})
+    generation = db_ops._schema_generation
+
+    # Act
+    db_ops.invalidate_schema_cache("t1")
+    db_ops.invalidate_schema_cache("t2")
+    db_ops.invalidate_schema_cache("t1") # Already tracked, so still per table
+    tracked = dict(db_ops._table_generations)
+    db_ops.invalidate_schema_cache("t3")
+
+    # Assert
+    assert tracked == {"t1": 2, "t2": 1}
+    assert db_ops._table_generations == {}
+    assert db_ops._schema_generation == generation + 1
 
 # --- Tests for get_table_sample --- #
 
-async def test_get_table_sample_success(mocker):
-    """Test successful table sample fetching returns list[dict]."""
+async def test_get_table_sample_success(mock_db):
+    """Test successful table sample fetching returns a columnar result."""
     # Arrange
     table_name = "my_table"
     limit = 5
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.description = [('id',), ('value',)]
-    mock_cursor.fetchall.return_value = [(1, 'abc'), (2, 'def')]
+    _prime(mock_db.cursor, [('id',), ('value',)], fetchmany=[(1, 'abc'), (2, 'def')])
 
     # Act
-    result = await db_ops.get_table_sample(mock_conn, table_name, limit)
+    result = await get_table_sample(mock_db.conn, table_name, limit)
 
     # Assert
-    expected_result = [
-        {'id': 1, 'value': 'abc'},
-        {'id': 2, 'value': 'def'}
-    ]
+    expected_result = {
+        'columns': ['id', 'value'],
+        'rows': [(1, 'abc'), (2, 'def')]
+    }
     assert result == expected_result
-    mock_cursor.execute.assert_called_once_with(f"SELECT * FROM {table_name} LIMIT {limit}")
-    # mock_conn.close() is no longer called by db_ops
-
-async def test_get_table_sample_no_data(mocker):
+    assert mock_db.cursor.execute.call_count == 1
+    assert mock_db.cursor.execute.call_args.args == ("SELECT * FROM my_table LIMIT 5",)
+    # Only `limit` rows are pulled, in a single driver batch
+    assert mock_db.cursor.arraysize == limit
+    assert mock_db.cursor.fetchmany.call_count == 1
+    assert mock_db.cursor.fetchmany.call_args.args == (limit,)
+    mock_db.cursor.fetchall.assert_not_called()
+    # mock_db.conn.close() is no longer called by db_ops
+
+async def test_get_table_sample_no_data(mock_db):
     """Test table sample fetching when table is empty or not found."""
     # Arrange
     table_name = "empty_table"
     limit = 10
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.description = [('colA',)]
-    mock_cursor.fetchall.return_value = []
+    _prime(mock_db.cursor, [('colA',)], fetchmany=[])
 
     # Act
-    output = await db_ops.get_table_sample(mock_conn, table_name, limit)
+    output = await get_table_sample(mock_db.conn, table_name, limit)
 
     # Assert
-    expected_msg = f"-- No data found in table '{table_name}' or table does not exist. --"
-    assert output == expected_msg
-    mock_cursor.execute.assert_called_once_with(f"SELECT * FROM {table_name} LIMIT {limit}")
-    # mock_conn.close() is no longer called by db_ops
+    assert (
+        output == "-- No data found in table 'empty_table' or table does not exist. --"
+    )
+    assert mock_db.cursor.execute.call_count == 1
+    assert mock_db.cursor.execute.call_args.args == (
+        "SELECT * FROM empty_table LIMIT 10",
+    )
+    # mock_db.conn.close() is no longer called by db_ops
 
-async def test_get_table_sample_invalid_table_name_raises(mocker):
+async def test_get_table_sample_invalid_table_name_raises():
     """Test invalid table name raises InvalidInputError."""
     # Arrange
     table_name = "invalid-name;"
     limit = 10
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor() # conn is not used by validation
 
     # Act & Assert
     with pytest.raises(InvalidInputError) as excinfo:
-        await db_ops.get_table_sample(mock_conn, table_name, limit)
+        # Rejected before a cursor is used
+        await get_table_sample(_UNUSED_CONN, table_name, limit)
 
-    assert f"Invalid table name '{table_name}'" in str(excinfo.value)
-    mock_cursor.execute.assert_not_called() # execute should not be called
+    assert "Invalid table name 'invalid-name;'" in str(excinfo.value)
 
-@pytest.mark.parametrize("invalid_limit", [-1, 0, "abc", None])
-async def test_get_table_sample_invalid_limit_defaults_to_10(mocker, invalid_limit):
+_DEFAULT_LIMIT_SAMPLE_SQL = "SELECT * FROM some_table LIMIT 10"
+
+_INVALID_LIMITS = (-1, 0, "abc", None)
+
+@pytest.fixture(scope="module")
+def default_limit_results():
+    """What the session serves for the default-limit sample of any invalid limit."""
+    return {_DEFAULT_LIMIT_SAMPLE_SQL: ((1,),)}
+
+@pytest.mark.parametrize("invalid_limit", _INVALID_LIMITS)
+async def test_get_table_sample_invalid_limit_defaults_to_10(
+    invalid_limit, default_limit_results
+):
     """Test that invalid limit values default to 10."""
     # Arrange
     table_name = "some_table"
-    default_limit = 10
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.description = [('id',)]
-    mock_cursor.fetchall.return_value = [(1,)]
+    conn, cursor = _fake_session(default_limit_results)
+    cursor.description = [('id',)]
 
     # Act
-    result = await db_ops.get_table_sample(mock_conn, table_name, invalid_limit)
+    result = await get_table_sample(conn, table_name, invalid_limit)
 
     # Assert
-    expected_result = [{'id': 1}]
+    expected_result = {'columns': ['id'], 'rows': [(1,)]}
     assert result == expected_result
-    mock_cursor.execute.assert_called_once_with(f"SELECT * FROM {table_name} LIMIT {default_limit}")
-    # mock_conn.close() is no longer called by db_ops
+    assert cursor.executed == [_DEFAULT_LIMIT_SAMPLE_SQL]
 
-async def test_get_table_sample_execution_error_raises(mocker):
-    """Test SQL execution error raises QueryExecutionError."""
+async def test_get_table_sample_arrow_from_rows(mock_db):
+    """Test drivers without a native Arrow fetch have rows converted per column."""
     # Arrange
-    table_name = "error_table"
-    limit = 10
-    original_exception = Exception("Syntax error")
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.execute.side_effect = original_exception
+    pa = pytest.importorskip("pyarrow")
+    _prime(mock_db.cursor, [('id',), ('value',)], fetchmany=[(1, 'abc'), (2, 'def')])
 
-    # Act & Assert
-    with pytest.raises(QueryExecutionError) as excinfo:
-        await db_ops.get_table_sample(mock_conn, table_name, limit)
-
-    assert f"Failed to execute sample query for table '{table_name}'" in str(excinfo.value)
-    assert excinfo.value.original_exception is original_exception
-    mock_cursor.execute.assert_called_once_with(f"SELECT * FROM {table_name} LIMIT {limit}")
-    # mock_conn.close() is no longer called by db_ops
-
-async def test_get_table_sample_invalid_connection_raises(mocker):
-    """Test invalid connection (e.g., None) raises DatabaseConnectionError."""
-    # Arrange
-    table_name = "any_table"
-    limit = 10
-    mock_conn = None # Simulate a bad connection
+    # Act
+    result = await db_ops.get_table_sample_arrow(mock_db.conn, "my_table", 2)
 
-    # Act & Assert
-    with pytest.raises(DatabaseConnectionError) as excinfo:
-        await db_ops.get_table_sample(mock_conn, table_name, limit)
-    assert "Provided database connection is invalid" in str(excinfo.value)
+    # Assert
+    assert isinstance(result, pa.Table)
+    assert result.column_names == ['id', 'value']
+    assert result.to_pydict() == {'id': [1, 2], 'value': ['abc', 'def']}
+    assert mock_db.cursor.execute.call_count == 1
+    assert mock_db.cursor.execute.call_args.args == ("SELECT * FROM my_table LIMIT 2",)
+    assert mock_db.cursor.fetchmany.call_count == 1
+    assert mock_db.cursor.fetchmany.call_args.args == (2,)
 
 
 # --- Tests for list_tables --- #
 
-async def test_list_tables_success(mocker):
+async def test_list_tables_success():
     """Test successful fetching of table list."""
     # Arrange
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.fetchall.return_value = [('table1',), ('table_two',), (None,), ('table3',)]
+    conn, cursor = _fake_session(
+        {"SHOW TABLES": [('table1',), ('table_two',), (None,), ('table3',)]}
+    )
 
     # Act
-    result = await db_ops.list_tables(mock_conn)
+    result = await list_tables(conn)
 
     # Assert
     expected_result = ['table1', 'table_two', 'table3']
     assert result == expected_result
-    mock_cursor.execute.assert_called_once_with("SHOW TABLES")
-    # mock_conn.close() is no longer called by db_ops
+    assert cursor.executed == ["SHOW TABLES"]
 
-async def test_list_tables_empty(mocker):
+async def test_list_tables_empty(empty_db):
     """Test fetching table list when database has no tables."""
+    # Act
+    result = await list_tables(empty_db.conn)
+
+    # Assert
+    assert result == []
+    assert empty_db.cursor.executed == ["SHOW TABLES"]
+
+async def test_list_tables_runs_on_db_thread_pool(mock_db):
+    """Test blocking driver calls run on the dedicated VAST DB worker threads."""
     # Arrange
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.fetchall.return_value = []
+    thread_names = []
+    mock_db.cursor.execute.side_effect = lambda sql: thread_names.append(
+        threading.current_thread().name
+    )
+    mock_db.cursor.fetchall.return_value = [('table1',)]
 
     # Act
-    result = await db_ops.list_tables(mock_conn)
+    result = await list_tables(mock_db.conn)
 
     # Assert
-    assert result == []
-    mock_cursor.execute.assert_called_once_with("SHOW TABLES")
-    # mock_conn.close() is no longer called by db_ops
+    assert result == ['table1']
+    assert len(thread_names) == 1
+    assert thread_names[0].startswith("vastdb")
+
 
-async def test_list_tables_execution_error_raises(mocker):
-    """Test error during SHOW TABLES raises QueryExecutionError."""
+async def test_list_tables_cached_until_table_ddl(mock_db, allow_only):
+    """Test the table list is reused until DDL through the server changes tables."""
     # Arrange
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    original_exception = Exception("SHOW TABLES not allowed")
-    mock_cursor.execute.side_effect = original_exception
+    allow_only("SELECT", "CREATE")
+    mock_db.cursor.fetchall.return_value = [('table1',)]
 
-    # Act & Assert
-    with pytest.raises(QueryExecutionError) as excinfo:
-        await db_ops.list_tables(mock_conn)
+    # Act
+    first = await list_tables(mock_db.conn)
+    first.append('caller_mutation') # Must not leak into the cached list
+    second = await list_tables(mock_db.conn)
+    mock_db.cursor.description = None
+    await execute_sql_query(mock_db.conn, "CREATE TABLE table2 (id INT)")
+    mock_db.cursor.fetchall.return_value = [('table1',), ('table2',)]
+    third = await list_tables(mock_db.conn)
 
-    assert "Failed to list tables" in str(excinfo.value)
-    assert excinfo.value.original_exception is original_exception
-    mock_cursor.execute.assert_called_once_with("SHOW TABLES")
-    # mock_conn.close() is no longer called by db_ops
+    # Assert
+    assert second == ['table1']
+    assert third == ['table1', 'table2']
+    assert mock_db.cursor.execute.call_args_list == [
+        call("SHOW TABLES"), call("CREATE TABLE table2 (id INT)"), call("SHOW TABLES")
+    ]
 
-async def test_list_tables_invalid_connection_raises(mocker):
-    """Test invalid connection (e.g., None) raises DatabaseConnectionError."""
+async def test_list_tables_cache_respects_table_list_ttl(monkeypatch, mock_db):
+    """Test MCP_TABLE_LIST_TTL=0 skips the table list cache even with schema caching."""
     # Arrange
-    mock_conn = None # Simulate a bad connection
+    monkeypatch.setattr(config, "TABLE_LIST_TTL", 0)
+    mock_db.cursor.fetchall.return_value = [('table1',)]
+
+    # Act
+    await list_tables(mock_db.conn)
+    await list_tables(mock_db.conn)
+
+    # Assert
+    assert mock_db.cursor.execute.call_count == 2
 
-    # Act & Assert
-    with pytest.raises(DatabaseConnectionError) as excinfo:
-        await db_ops.list_tables(mock_conn)
-    assert "Provided database connection is invalid" in str(excinfo.value)
+
+# --- Tests for prefetch_tables_with_samples --- #
+
+async def test_prefetch_tables_with_samples_success(mock_db):
+    """Test every listed table is sampled and keyed by table name."""
+    # Arrange
+    mock_db.cursor.fetchall.return_value = [('table1',), ('table2',)]
+    _prime(mock_db.cursor, [('id',)], fetchmany=[(1,)])
+
+    # Act
+    result = await db_ops.prefetch_tables_with_samples(mock_db.conn, 5)
+
+    # Assert
+    expected_sample = {'columns': ['id'], 'rows': [(1,)]}
+    assert result == {'table1': expected_sample, 'table2': expected_sample}
+    executed = sorted(call.args[0] for call in mock_db.cursor.execute.call_args_list)
+    assert executed == [
+        "SELECT * FROM table1 LIMIT 5",
+        "SELECT * FROM table2 LIMIT 5",
+        "SHOW TABLES",
+    ]
+
+async def test_prefetch_tables_with_samples_keeps_per_table_errors():
+    """Test a failing table sample is returned as its exception, not raised."""
+    # Arrange
+    original_exception = Exception("Permission denied")
+    conn, cursor = _fake_session({
+        "SHOW TABLES": [('ok',), ('broken',)],
+        "SELECT * FROM ok LIMIT 10": [(1,)],
+        "SELECT * FROM broken LIMIT 10": original_exception,
+    })
+    cursor.description = [('id',)]
+
+    # Act
+    result = await db_ops.prefetch_tables_with_samples(conn)
+
+    # Assert
+    assert result['ok'] == {'columns': ['id'], 'rows': [(1,)]}
+    assert isinstance(result['broken'], QueryExecutionError)
+    assert result['broken'].original_exception is original_exception
 
 
 # --- Tests for execute_sql_query --- #
 
-async def test_execute_sql_query_success(mocker):
-    """Test successful execution of a SELECT query returns list[dict]."""
+_NO_ROWS_MSG = "-- Query executed successfully, but returned no rows. --"
+
+async def test_execute_sql_query_success():
+    """Test successful execution of a SELECT query returns a columnar result."""
     # Arrange
     sql = "SELECT id, name FROM users WHERE id = 1"
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.description = [('id',), ('name',)]
-    mock_cursor.fetchall.return_value = [(1, 'Alice')]
+    conn, cursor = _fake_session({sql: [(1, 'Alice')]})
+    cursor.description = [('id',), ('name',)]
 
     # Act
-    result = await db_ops.execute_sql_query(mock_conn, sql)
+    result = await execute_sql_query(conn, sql)
 
     # Assert
-    expected_result = [{'id': 1, 'name': 'Alice'}]
+    expected_result = {'columns': ['id', 'name'], 'rows': [(1, 'Alice')]}
     assert result == expected_result
-    mock_cursor.execute.assert_called_once_with(sql)
-    # mock_conn.close() is no longer called by db_ops
+    assert cursor.executed == [sql]
 
-@pytest.mark.parametrize("non_allowed_sql, statement_type", [
+_NON_SELECT_SQLS = (
     ("INSERT INTO users (id, name) VALUES (2, 'Bob')", "INSERT"),
     ("UPDATE users SET name = 'Charlie' WHERE id = 1", "UPDATE"),
     ("DELETE FROM users WHERE id = 1", "DELETE"),
     ("DROP TABLE users", "DROP"),
     ("CREATE TABLE new_t (c int);", "CREATE"),
     ("-- SELECT * FROM users;\nDROP TABLE users;", "DROP"), # Assuming sqlparse handles comments
-])
-async def test_execute_sql_query_rejects_non_allowed_type_raises(mocker, non_allowed_sql, statement_type):
+)
+
+_NON_SELECT_IDS = ("insert", "update", "delete", "drop", "create", "comment_drop")
+
+# Each statement paired with the rejection message expected when only SELECT is allowed.
+_NON_SELECT_REJECTIONS = tuple(
+    (
+        sql,
+        re.compile(
+            rf"Query type '{statement_type}' is not allowed\. Allowed types: SELECT\."
+        ),
+    )
+    for sql, statement_type in _NON_SELECT_SQLS
+)
+
+@pytest.mark.parametrize(
+    "non_allowed_sql, expected_msg", _NON_SELECT_REJECTIONS, ids=_NON_SELECT_IDS
+)
+async def test_execute_sql_query_rejects_non_allowed_type_raises(
+    non_allowed_sql, expected_msg, allow_only
+):
     """Test non-allowed SQL statements raise InvalidInputError with dynamic message."""
     # Arrange
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor() # conn not used by validation
-    
-    # Temporarily modify ALLOWED_SQL_TYPES in config for this test if needed,
-    # or ensure it's set to something like ['SELECT'] for this test to be meaningful.
-    # For this example, we assume config.ALLOWED_SQL_TYPES does NOT include `statement_type`.
-    # If it does, this test would need adjustment or a different `statement_type`.
-    original_allowed_types = config.ALLOWED_SQL_TYPES
-    config.ALLOWED_SQL_TYPES = ['SELECT'] # Ensure only SELECT is allowed for this test case
+    allow_only("SELECT") # Only SELECT is allowed for this test
 
-    allowed_str = ", ".join(config.ALLOWED_SQL_TYPES)
-    expected_msg_regex = f"Query type '{statement_type}' is not allowed. Allowed types: {allowed_str}."
+    # Act & Assert
+    with pytest.raises(InvalidInputError, match=expected_msg):
+        await execute_sql_query(_UNUSED_CONN, non_allowed_sql)
+
+
+@patch('sqlparse.parse')
+async def test_execute_sql_query_leading_keyword_rejected_without_parsing(
+    mock_parse, allow_only
+):
+    """Test a plainly disallowed leading keyword is rejected before sqlparse runs."""
+    # Arrange
+    allow_only("SELECT")
 
     # Act & Assert
-    with pytest.raises(InvalidInputError, match=expected_msg_regex):
-        await db_ops.execute_sql_query(mock_conn, non_allowed_sql)
+    with pytest.raises(InvalidInputError, match="Query type 'DROP' is not allowed"):
+        await execute_sql_query(_UNUSED_CONN, "  drop TABLE users")
+
+    mock_parse.assert_not_called()
+
+
+async def test_execute_sql_query_allows_cte_select(mock_db):
+    """Test a SELECT starting with WITH is not rejected by the leading-keyword check."""
+    # Arrange
+    sql = "WITH recent AS (SELECT id FROM users) SELECT id FROM recent"
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,)])
+
+    # Act
+    result = await execute_sql_query(mock_db.conn, sql)
+
+    # Assert
+    assert result == {'columns': ['id'], 'rows': [(1,)]}
+    assert mock_db.cursor.execute.call_count == 1
+    assert mock_db.cursor.execute.call_args.args == (sql,)
+
+@patch.object(sqlparse, 'parse', wraps=sqlparse.parse)
+async def test_execute_sql_query_simple_select_skips_sqlparse(parse_spy, mock_db):
+    """Test a plain single SELECT is classified by its leading keyword, not sqlparse."""
+    # Arrange
+    sql = "/* dashboard */ SELECT id FROM users;"
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,)])
+
+    # Act
+    result = await execute_sql_query(mock_db.conn, sql)
+
+    # Assert
+    assert result == {'columns': ['id'], 'rows': [(1,)]}
+    parse_spy.assert_not_called()
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id FROM users WHERE note = 'a;b'",
+    "SELECT id FROM users -- note;\nWHERE id = 1",
+])
+@patch.object(sqlparse, 'parse', wraps=sqlparse.parse)
+async def test_execute_sql_query_inner_semicolon_uses_sqlparse(parse_spy, sql, mock_db):
+    """Test any semicolon before the end of the query is left to sqlparse."""
+    # Arrange
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,)])
+
+    # Act
+    result = await execute_sql_query(mock_db.conn, sql)
+
+    # Assert
+    assert result == {'columns': ['id'], 'rows': [(1,)]}
+    parse_spy.assert_called_once()
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT id FROM users; DROP TABLE users",
+        # A stray quote must not hide the separators
+        "SELECT [it's]; DROP TABLE x; SELECT 'a'",
+    ],
+)
+async def test_execute_sql_query_rejects_multi_statement(sql, allow_only):
+    """Test several statements are rejected even when each one is an allowed type."""
+    allow_only("SELECT", "DROP")
+
+    with pytest.raises(InvalidInputError, match="Multi-statement"):
+        await execute_sql_query(_UNUSED_CONN, sql)
+
+@patch.object(sqlparse, 'parse', wraps=sqlparse.parse)
+async def test_execute_sql_query_repeated_query_parsed_once(parse_spy, mock_db):
+    """Test the sqlparse classification of a query is cached across calls."""
+    # Arrange
+    sql = "WITH u AS (SELECT id FROM users) SELECT id FROM u" # WITH needs sqlparse
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,)])
+
+    # Act
+    await execute_sql_query(mock_db.conn, sql)
+    await execute_sql_query(mock_db.conn, sql)
+
+    # Assert
+    parse_spy.assert_called_once_with(sql)
+    assert mock_db.cursor.execute.call_count == 2
+
+@patch.object(sqlparse, 'parse', wraps=sqlparse.parse)
+async def test_execute_sql_query_whitespace_variants_share_classification(
+    parse_spy, mock_db
+):
+    """Test queries differing only in surrounding whitespace are parsed once."""
+    # Arrange
+    sql = "WITH u AS (SELECT id FROM users) SELECT id FROM u"
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,)])
+
+    # Act
+    await execute_sql_query(mock_db.conn, sql)
+    await execute_sql_query(mock_db.conn, "\n  " + sql + " \n")
+
+    # Assert
+    parse_spy.assert_called_once_with(sql)
+    # The original text is executed
+    mock_db.cursor.execute.assert_called_with("\n  " + sql + " \n")
+
+async def test_execute_sql_query_concurrent_identical_selects_share_execution(mock_db):
+    """Test identical concurrent SELECTs run once and every caller gets the result."""
+    # Arrange
+    sql = "SELECT id FROM users"
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,)])
+
+    # Act
+    results = await asyncio.gather(
+        *(execute_sql_query(mock_db.conn, sql) for _ in range(3))
+    )
+
+    # Assert
+    assert results == [{'columns': ['id'], 'rows': [(1,)]}] * 3
+    assert mock_db.cursor.execute.call_count == 1
+    assert mock_db.cursor.execute.call_args.args == (sql,)
+    assert db_ops._inflight_selects == {}
+
+async def test_execute_sql_query_select_after_write_does_not_join_earlier_select(
+    mock_db,
+):
+    """Test a SELECT issued after a write reruns instead of sharing an earlier one."""
+    # Arrange
+    sql = "SELECT id FROM users"
+    started, release = threading.Event(), threading.Event()
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,)])
+
+    def execute(query):
+        if not started.is_set():
+            started.set()
+            release.wait(timeout=5) # Hold the first SELECT open across the write
+
+    mock_db.cursor.execute.side_effect = execute
+
+    # Act
+    before_write = asyncio.ensure_future(execute_sql_query(mock_db.conn, sql))
+    await asyncio.to_thread(started.wait, 5)
+    db_ops.invalidate_result_cache() # A write committed while the first SELECT runs
+    after_write = asyncio.ensure_future(execute_sql_query(mock_db.conn, sql))
+    await asyncio.sleep(0.05)
+    release.set()
+    await asyncio.gather(before_write, after_write)
+
+    # Assert
+    assert mock_db.cursor.execute.call_count == 2
+    assert db_ops._inflight_selects == {}
+
+async def test_execute_sql_query_result_cache_reuses_select_until_write(
+    monkeypatch, mock_db, allow_only
+):
+    """Test a cached SELECT result is reused until a write runs through the server."""
+    # Arrange
+    monkeypatch.setattr(config, "RESULT_CACHE_TTL", 60)
+    allow_only("SELECT", "INSERT")
+    sql = "SELECT id FROM users"
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,)])
+
+    # Act
+    first = await execute_sql_query(mock_db.conn, sql)
+    second = await execute_sql_query(mock_db.conn, sql)
+    mock_db.cursor.description = None
+    await execute_sql_query(mock_db.conn, "INSERT INTO users VALUES (2)")
+    _prime(mock_db.cursor, [('id',)], fetchall=[(1,), (2,)])
+    third = await execute_sql_query(mock_db.conn, sql)
+
+    # Assert
+    assert first == second == {'columns': ['id'], 'rows': [(1,)]}
+    assert third == {'columns': ['id'], 'rows': [(1,), (2,)]}
+    assert mock_db.cursor.execute.call_args_list == [
+        call(sql),
+        call("INSERT INTO users VALUES (2)"),
+        call(sql),
+    ]
+
+async def test_get_table_sample_result_cache(monkeypatch, mock_db):
+    """Test repeated samples hit the result cache only when it is enabled."""
+    # Arrange
+    _prime(mock_db.cursor, [('id',)], fetchmany=[(1,)])
+
+    # Act
+    await get_table_sample(mock_db.conn, "my_table", 5)
+    await get_table_sample(mock_db.conn, "my_table", 5) # Caching is off by default
+    monkeypatch.setattr(config, "RESULT_CACHE_TTL", 60)
+    cached_first = await get_table_sample(mock_db.conn, "my_table", 5)
+    cached_second = await get_table_sample(mock_db.conn, "my_table", 5)
+
+    # Assert
+    assert cached_second == cached_first == {'columns': ['id'], 'rows': [(1,)]}
+    assert mock_db.cursor.execute.call_count == 3
+
+async def test_precomputed_metric_answers_identical_query_until_write(
+    monkeypatch, mock_db, allow_only
+):
+    """Test a refreshed metric is served without executing it until a write."""
+    # Arrange
+    allow_only("SELECT", "DELETE")
+    monkeypatch.setattr(db_ops, "_metrics", {})
+    monkeypatch.setattr(db_ops, "_metric_results", weakref.WeakKeyDictionary())
+    sql = "SELECT COUNT(*) AS n FROM orders"
+    _prime(mock_db.cursor, [('n',)], fetchall=[(42,)])
+    db_ops.register_metric("order_count", sql)
+    await db_ops.refresh_metrics(mock_db.conn)
+    mock_db.cursor.execute.reset_mock()
+
+    # Act
+    precomputed = await execute_sql_query(mock_db.conn, "  " + sql)
+    executed_before = mock_db.cursor.execute.call_count
+    mock_db.cursor.description = None
+    await execute_sql_query(mock_db.conn, "DELETE FROM orders")
+    _prime(mock_db.cursor, [('n',)], fetchall=[(0,)])
+    after_write = await execute_sql_query(mock_db.conn, sql)
 
-    mock_cursor.execute.assert_not_called()
-    # Restore original ALLOWED_SQL_TYPES if changed
-    config.ALLOWED_SQL_TYPES = original_allowed_types
+    # Assert
+    assert precomputed == {'columns': ['n'], 'rows': [(42,)]}
+    assert executed_before == 0
+    assert after_write == {'columns': ['n'], 'rows': [(0,)]}
+
+async def test_precomputed_metric_expires_after_max_age(
+    monkeypatch, mock_db, allow_only
+):
+    """Test a precomputed result older than METRIC_MAX_AGE_SECONDS is not served."""
+    # Arrange
+    allow_only("SELECT")
+    monkeypatch.setattr(db_ops, "_metrics", {})
+    monkeypatch.setattr(db_ops, "_metric_results", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(config, "METRIC_MAX_AGE_SECONDS", 60)
+    sql = "SELECT COUNT(*) AS n FROM orders"
+    _prime(mock_db.cursor, [('n',)], fetchall=[(42,)])
+    db_ops.register_metric("order_count", sql)
+    await db_ops.refresh_metrics(mock_db.conn)
+    _prime(mock_db.cursor, [('n',)], fetchall=[(7,)])
+    now = db_ops.time.monotonic()
+
+    # Act
+    with patch.object(db_ops.time, "monotonic", return_value=now + 30):
+        fresh = await execute_sql_query(mock_db.conn, sql)
+    with patch.object(db_ops.time, "monotonic", return_value=now + 120):
+        expired = await execute_sql_query(mock_db.conn, sql)
 
+    # Assert
+    assert fresh == {'columns': ['n'], 'rows': [(42,)]}
+    assert expired == {'columns': ['n'], 'rows': [(7,)]}
+
+async def test_precomputed_metric_is_not_served_to_another_session(
+    monkeypatch, mock_db, allow_only
+):
+    """Test results are kept per session object, not per session id."""
+    allow_only("SELECT")
+    monkeypatch.setattr(db_ops, "_metrics", {})
+    monkeypatch.setattr(db_ops, "_metric_results", weakref.WeakKeyDictionary())
+    sql = "SELECT COUNT(*) AS n FROM orders"
+    _prime(mock_db.cursor, [('n',)], fetchall=[(42,)])
+    db_ops.register_metric("order_count", sql)
+    await db_ops.refresh_metrics(mock_db.conn)
+
+    assert db_ops._precomputed_result(mock_db.conn, sql) == {
+        'columns': ['n'],
+        'rows': [(42,)],
+    }
+    assert db_ops._precomputed_result(_fake_session({})[0], sql) is None
+
+@pytest.mark.parametrize("raw", ['{"order_count": ', '["SELECT 1"]', '{"n": 1}'])
+def test_load_metrics_ignores_malformed_value(raw):
+    """Test a malformed MCP_PRECOMPUTED_METRICS is ignored instead of raising."""
+    assert config._load_metrics(raw) == {}
+    assert config._load_metrics('{"n": "SELECT 1"}') == {"n": "SELECT 1"}
+
+def test_register_metric_rejects_non_select(monkeypatch, allow_only):
+    """Test only SELECT queries can be registered as precomputed metrics."""
+    allow_only("SELECT", "DELETE")
+    monkeypatch.setattr(db_ops, "_metrics", {})
+
+    with pytest.raises(InvalidInputError, match="must be a SELECT"):
+        db_ops.register_metric("purge", "DELETE FROM orders")
+
+def test_register_metrics_skips_invalid_entries(monkeypatch, allow_only):
+    """Test one invalid metric is skipped without blocking the others."""
+    allow_only("SELECT", "DELETE")
+    monkeypatch.setattr(db_ops, "_metrics", {})
+
+    registered = db_ops.register_metrics({
+        "purge": "DELETE FROM orders",
+        "order_count": "SELECT COUNT(*) FROM orders",
+    })
+
+    assert registered == 1
+    assert db_ops._metrics == {"SELECT COUNT(*) FROM orders": "order_count"}
+
+async def test_execute_sql_query_runs_union_all_as_one_query():
+    """Test a UNION ALL query runs as one statement even with several sessions."""
+    # Arrange
+    sql = "SELECT id FROM orders UNION ALL SELECT id FROM archived_orders"
+    conn, cursor = _fake_session({sql: [(1,), (3,)]})
+    cursor.description = [('id',)]
+    pool = SessionPool(lambda: conn, max_size=2)
+
+    # Act
+    result = await execute_sql_query(pool, sql)
+
+    # Assert
+    assert cursor.executed == [sql]
+    assert result == {"columns": ["id"], "rows": [(1,), (3,)]}
 
-async def test_execute_sql_query_empty_result(mocker):
+async def test_execute_sql_query_empty_result():
     """Test SELECT query that returns no rows."""
     # Arrange
     sql = "SELECT id FROM users WHERE name = 'NonExistent'"
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.description = [('id',)]
-    mock_cursor.fetchall.return_value = []
+    conn, cursor = _fake_session({sql: []})
+    cursor.description = [('id',)]
+
+    # Act
+    output = await execute_sql_query(conn, sql)
+
+    # Assert
+    assert output == _NO_ROWS_MSG
+    assert cursor.executed == [sql]
+
+@pytest.mark.parametrize(
+    "sql, expected_output",
+    [
+        # A SELECT without a description selected nothing (e.g. an empty view)
+        ("SELECT * FROM some_view", _NO_ROWS_MSG),
+        # Anything else without a description is DDL/DML that does not return rows
+        (
+            "CREATE TABLE my_new_table (id INT)",
+            "-- Query executed, but it was not a type that returns rows. --",
+        ),
+    ],
+    ids=["select", "create"],
+)
+async def test_execute_sql_query_no_description(sql, expected_output, allow_only):
+    """Test a query whose cursor.description is None after execute, by type."""
+    # Arrange
+    allow_only("SELECT", "CREATE")
+    conn, cursor = _fake_session({}) # No description, no rows
 
     # Act
-    output = await db_ops.execute_sql_query(mock_conn, sql)
+    output = await execute_sql_query(conn, sql)
 
     # Assert
-    assert output == "-- Query executed successfully, but returned no rows. --"
-    mock_cursor.execute.assert_called_once_with(sql)
-    # mock_conn.close() is no longer called by db_ops
+    assert output == expected_output
+    assert cursor.executed == [sql]
+
 
-async def test_execute_sql_query_no_description_select(mocker):
-    """Test SELECT query where cursor.description is None after execute (should be empty result)."""
+@patch.object(db_ops, "logger")
+async def test_execute_sql_query_error_logs_traceback_only_at_debug(
+    mock_logger, mock_db
+):
+    """Test a failed query is logged at ERROR without formatting a traceback there."""
     # Arrange
-    sql = "SELECT * FROM some_view" # Example of a SELECT
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.description = None # Simulate no description (e.g. empty view or specific DB behavior)
-    
-    # We need to mock the statement type for this specific test path
-    mocker.patch('sqlparse.parse', return_value=[MagicMock(get_type=lambda: 'SELECT')])
+    mock_db.cursor.execute.side_effect = Exception("boom")
+    mock_logger.isEnabledFor.side_effect = lambda level: level >= db_ops.logging.INFO
 
+    # Act
+    with pytest.raises(QueryExecutionError):
+        await execute_sql_query(mock_db.conn, "SELECT 1")
+
+    # Assert
+    error_call = mock_logger.error.call_args
+    assert error_call.args[0] == "Error executing SQL query in VAST DB: %s"
+    assert "exc_info" not in error_call.kwargs
+    mock_logger.debug.assert_not_called()
+
+async def test_fetch_table_sample_interns_column_names(mock_db):
+    """Test repeated samples of the same table reuse the same column-name objects."""
+    # Arrange
+    # Built at runtime, so not interned already
+    _prime(mock_db.cursor, [(''.join(['user', ' ', 'id']),)], fetchmany=[(1,)])
+    first = await get_table_sample(mock_db.conn, "my_table", 1)
+    mock_db.cursor.description = [(''.join(['user', ' ', 'id']),)]
 
     # Act
-    output = await db_ops.execute_sql_query(mock_conn, sql)
+    second = await get_table_sample(mock_db.conn, "my_table", 1)
 
     # Assert
-    # If it's a SELECT and description is None, it means 0 columns were selected or 0 rows.
-    # The current logic in db_ops.py returns "-- Query executed successfully, but returned no rows. --"
-    # if cursor.description is None BUT statement_type is 'SELECT'
-    assert output == "-- Query executed successfully, but returned no rows. --"
-    mock_cursor.execute.assert_called_once_with(sql)
-    # mock_conn.close() is no longer called by db_ops
+    assert first['columns'][0] is second['columns'][0]
+
+@pytest.mark.parametrize(
+    "table_name, limit", [("users; DROP TABLE x", 5), ("users", 0), ("users", "5")]
+)
+def test_sample_sql_rejects_unchecked_input(table_name, limit):
+    """Test the sample statement builder refuses text its caller did not validate."""
+    with pytest.raises(InvalidInputError):
+        db_ops._sample_sql(table_name, limit)
 
-async def test_execute_sql_query_no_description_non_select(mocker):
-    """Test non-SELECT query where cursor.description is None (e.g. DDL)."""
+@pytest.mark.parametrize(
+    "fetch", [db_ops._fetch_table_sample_sync, db_ops._fetch_table_sample_arrow_sync]
+)
+def test_sample_fetch_rejects_bad_input_without_borrowing_a_session(fetch):
+    """Test invalid sample input is rejected before a session is checked out."""
     # Arrange
-    # For this test, assume 'CREATE' is an allowed type for a moment
-    sql = "CREATE TABLE my_new_table (id INT)"
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.description = None
+    make_session = Mock()
+    pool = SessionPool(make_session, max_size=1)
+
+    # Act / Assert
+    with pytest.raises(InvalidInputError):
+        fetch(pool, "users; DROP TABLE x", 5)
+    make_session.assert_not_called()
+
+# --- Tests for stream_sql_query / stream_table_sample --- #
 
-    # Mock sqlparse to control the statement type for this test
-    mock_statement = MagicMock()
-    mock_statement.get_type.return_value = 'CREATE' 
-    mocker.patch('sqlparse.parse', return_value=[mock_statement])
-    
-    original_allowed_types = config.ALLOWED_SQL_TYPES
-    config.ALLOWED_SQL_TYPES = ['CREATE'] # Temporarily allow CREATE for this test
+async def test_stream_sql_query_yields_batches(mock_db):
+    """Test rows are fetched with fetchmany and yielded batch by batch."""
+    # Arrange
+    sql = "SELECT id, name FROM users"
+    mock_db.cursor.description = [('id',), ('name',)]
+    mock_db.cursor.fetchmany.side_effect = [
+        [(1, 'Alice'), (2, 'Bob')],
+        [(3, 'Carol')],
+        [],
+    ]
 
     # Act
-    output = await db_ops.execute_sql_query(mock_conn, sql)
+    batches = [
+        batch
+        async for batch in db_ops.stream_sql_query(mock_db.conn, sql, batch_size=2)
+    ]
 
     # Assert
-    # If it's not a SELECT and description is None, it means it's a DDL/DML that doesn't return rows.
-    expected_msg = "-- Query executed, but it was not a type that returns rows. --"
-    assert output == expected_msg
-    mock_cursor.execute.assert_called_once_with(sql)
-    
-    config.ALLOWED_SQL_TYPES = original_allowed_types # Restore
+    assert batches == [
+        {'columns': ['id', 'name'], 'rows': [(1, 'Alice'), (2, 'Bob')]},
+        {'columns': ['id', 'name'], 'rows': [(3, 'Carol')]},
+    ]
+    assert mock_db.cursor.execute.call_count == 1
+    assert mock_db.cursor.execute.call_args.args == (sql,)
+    mock_db.cursor.fetchmany.assert_called_with(2)
+    mock_db.cursor.fetchall.assert_not_called()
+
+async def test_stream_sql_query_early_close_stops_fetching(mock_db):
+    """Test closing the stream early stops fetching and releases the cursor."""
+    # Arrange
+    _prime(mock_db.cursor, [('id',)], fetchmany=[(1,)]) # An endless result set
+
+    # Act
+    stream = db_ops.stream_sql_query(
+        mock_db.conn, "SELECT id FROM big_table", batch_size=1
+    )
+    first = await stream.__anext__()
+    await stream.aclose()
 
+    # Assert
+    assert first == {'columns': ['id'], 'rows': [(1,)]}
+    mock_db.cursor.close.assert_called_once()
+    assert mock_db.cursor.fetchmany.call_count < 10
 
-async def test_execute_sql_query_execution_error_raises(mocker):
-    """Test SQL execution error raises QueryExecutionError."""
+@pytest.mark.parametrize("close_loop", [False, True])
+def test_put_from_thread_gives_up_when_loop_is_gone(monkeypatch, close_loop):
+    """Test a DB thread blocked on a full stream queue returns once the loop ends."""
     # Arrange
-    sql = "SELECT bad_col FROM users"
-    original_exception = Exception("Column 'bad_col' not found")
-    mock_conn, mock_cursor = _get_mock_conn_and_cursor()
-    mock_cursor.execute.side_effect = original_exception
+    monkeypatch.setattr(db_ops, "_STREAM_EMIT_POLL", 0.01)
+    loop = asyncio.new_event_loop() # Never run, as if the server had shut down
+    queue = asyncio.Queue(maxsize=1)
+    queue.put_nowait("full")
+    if close_loop:
+        loop.close()
+
+    # Act
+    worker = threading.Thread(
+        target=db_ops._put_from_thread, args=(queue, "batch", loop, threading.Event())
+    )
+    worker.start()
+    worker.join(timeout=5)
 
+    # Assert
+    assert not worker.is_alive()
+    if not close_loop:
+        loop.run_until_complete(asyncio.sleep(0)) # Let the cancelled put finish
+        loop.close()
+
+async def test_put_from_thread_drops_batches_after_stop(monkeypatch):
+    """Test a blocked DB thread stops waiting once the consumer sets `stop`."""
+    # Arrange
+    monkeypatch.setattr(db_ops, "_STREAM_EMIT_POLL", 0.01)
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=1)
+    queue.put_nowait("full")
+    stop = threading.Event()
+
+    # Act
+    put = asyncio.ensure_future(
+        asyncio.to_thread(db_ops._put_from_thread, queue, "batch", loop, stop)
+    )
+    await asyncio.sleep(0.05)
+    stop.set()
+    await asyncio.wait_for(put, timeout=5)
+
+    # Assert
+    assert queue.qsize() == 1
+
+@pytest.mark.parametrize(
+    "sql",
+    ["SELECT * FROM some_view", "SELECT id FROM users WHERE id < 0"],
+    ids=["no-description", "no-rows"],
+)
+async def test_stream_sql_query_empty_select_yields_nothing(sql):
+    """Test an empty SELECT stream yields no batches, with or without a description."""
+    conn, cursor = _fake_session({sql: []})
+    if "users" in sql:
+        cursor.description = [('id',)]
+
+    assert [batch async for batch in db_ops.stream_sql_query(conn, sql)] == []
+
+async def test_stream_sql_query_non_select_yields_execute_message(allow_only):
+    """Test a statement without a result set streams execute_sql_query's message."""
+    # Arrange
+    allow_only("SELECT", "CREATE")
+    sql = "CREATE TABLE my_new_table (id INT)"
+    conn, _ = _fake_session({})
+    buffered = await execute_sql_query(conn, sql)
+
+    # Act
+    streamed = [item async for item in db_ops.stream_sql_query(conn, sql)]
+
+    # Assert
+    assert (
+        streamed
+        == [buffered]
+        == ["-- Query executed, but it was not a type that returns rows. --"]
+    )
+
+async def test_stream_sql_query_cancelled_while_closing_releases_session(
+    monkeypatch, mock_db
+):
+    """Test cancelling a full stream's cleanup still frees its DB thread."""
+    # Arrange
+    monkeypatch.setattr(db_ops, "_STREAM_EMIT_POLL", 0.01)
+    monkeypatch.setattr(db_ops, "_STREAM_QUEUE_SIZE", 1)
+    producer_returned = threading.Event()
+    stream_query_sync = db_ops._stream_query_sync
+
+    def tracked_stream_query_sync(*args):
+        try:
+            stream_query_sync(*args)
+        finally:
+            producer_returned.set()
+
+    monkeypatch.setattr(db_ops, "_stream_query_sync", tracked_stream_query_sync)
+    _prime(mock_db.cursor, [('id',)], fetchmany=[(1,)]) # An endless result set
+    stream = db_ops.stream_sql_query(
+        mock_db.conn, "SELECT id FROM big_table", batch_size=1
+    )
+    await stream.__anext__()
+    # The producer fills the queue and blocks on the next batch
+    await asyncio.sleep(0.05)
+
+    # Act
+    closing = asyncio.ensure_future(stream.aclose())
+    await asyncio.sleep(0) # Let the cleanup start
+    closing.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await closing
+
+    # Assert
+    assert await asyncio.to_thread(producer_returned.wait, 2)
+    mock_db.cursor.close.assert_called_once()
+
+async def test_stream_sql_query_rejects_non_allowed_type():
+    """Test streaming validates the query before touching the DB."""
     # Act & Assert
-    with pytest.raises(QueryExecutionError) as excinfo:
-        await db_ops.execute_sql_query(mock_conn, sql)
+    with pytest.raises(InvalidInputError):
+        async for _ in db_ops.stream_sql_query(_UNUSED_CONN, "DELETE FROM users"):
+            pass
 
-    assert "Error executing SQL query" in str(excinfo.value)
-    assert excinfo.value.original_exception is original_exception
-    mock_cursor.execute.assert_called_once_with(sql)
-    # mock_conn.close() is no longer called by db_ops
+async def test_stream_sql_query_enables_driver_streaming_mode():
+    """Test drivers with a server-side cursor mode have it enabled before execute."""
+    # Arrange
+    class StreamingCursor:
+        itersize = 2000
+        description = [('id',)]
+
+        def __init__(self):
+            self.stream_results = False
+            self.fetchmany = MagicMock(side_effect=[[(1,)], []])
+
+        def set_stream_results(self, enabled):
+            self.stream_results = enabled
+
+        def execute(self, sql):
+            assert self.stream_results # Must be enabled before the query runs
+
+    cursor = StreamingCursor()
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value = cursor
+
+    # Act
+    batches = [
+        batch
+        async for batch in db_ops.stream_sql_query(
+            mock_conn, "SELECT id FROM t", batch_size=500
+        )
+    ]
 
-async def test_execute_sql_query_invalid_connection_raises(mocker):
-    """Test invalid connection (e.g., None) raises DatabaseConnectionError."""
+    # Assert
+    assert batches == [{'columns': ['id'], 'rows': [(1,)]}]
+    assert cursor.arraysize == 500
+    assert cursor.itersize == 500
+
+async def test_stream_table_sample_caps_batch_at_limit(mock_db):
+    """Test a streamed sample uses the LIMIT query and batches no larger than it."""
+    # Arrange
+    mock_db.cursor.description = [('id',)]
+    mock_db.cursor.fetchmany.side_effect = [[(1,), (2,), (3,)], []]
+
+    # Act
+    batches = [
+        batch async for batch in db_ops.stream_table_sample(mock_db.conn, "my_table", 3)
+    ]
+
+    # Assert
+    assert batches == [{'columns': ['id'], 'rows': [(1,), (2,), (3,)]}]
+    assert mock_db.cursor.execute.call_count == 1
+    assert mock_db.cursor.execute.call_args.args == ("SELECT * FROM my_table LIMIT 3",)
+    mock_db.cursor.fetchmany.assert_called_with(3)
+
+# --- Tests for DB errors shared by every operation --- #
+
+async def _drain_stream(conn, sql):
+    async for _ in db_ops.stream_sql_query(conn, sql):
+        pass
+
+@pytest.mark.parametrize(
+    "operation, expected_error, message, expected_calls",
+    [
+        (
+            lambda conn: get_db_schema(conn),
+            SchemaFetchError,
+            "Error fetching schema",
+            # The failed catalog query falls back to SHOW TABLES, which fails too
+            [call(db_ops._CATALOG_COLUMNS_SQL), call("SHOW TABLES")],
+        ),
+        (
+            lambda conn: get_table_sample(conn, "error_table", 10),
+            QueryExecutionError,
+            "Failed to execute sample query for table 'error_table'",
+            [call("SELECT * FROM error_table LIMIT 10")],
+        ),
+        (
+            lambda conn: list_tables(conn),
+            QueryExecutionError,
+            "Failed to list tables",
+            [call("SHOW TABLES")],
+        ),
+        (
+            lambda conn: execute_sql_query(conn, "SELECT bad_col FROM users"),
+            QueryExecutionError,
+            "Error executing SQL query",
+            [call("SELECT bad_col FROM users")],
+        ),
+        (
+            lambda conn: _drain_stream(conn, "SELECT * FROM users"),
+            QueryExecutionError,
+            "Error executing SQL query",
+            [call("SELECT * FROM users")],
+        ),
+    ],
+    ids=[
+        "get_db_schema",
+        "get_table_sample",
+        "list_tables",
+        "execute_sql_query",
+        "stream_sql_query",
+    ],
+)
+async def test_execution_error_raises(
+    mock_db, operation, expected_error, message, expected_calls
+):
+    """Test a DB error during execute surfaces as a VastMcpError keeping the cause."""
     # Arrange
-    sql = "SELECT 1"
-    mock_conn = None # Simulate a bad connection
+    original_exception = _SYNTAX_ERR
+    mock_db.cursor.execute.side_effect = original_exception
 
     # Act & Assert
-    with pytest.raises(DatabaseConnectionError) as excinfo:
-        await db_ops.execute_sql_query(mock_conn, sql)
-    assert "Provided database connection is invalid" in str(excinfo.value)
-    # The TODO for adding tests for execute_sql_query can be removed as this covers a connection case
\ No newline at end of file
+    with pytest.raises(expected_error, match=message) as excinfo:
+        await operation(mock_db.conn)
+
+    assert excinfo.value.original_exception is original_exception
+    assert mock_db.cursor.execute.call_args_list == expected_calls
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        lambda conn: get_db_schema(conn),
+        lambda conn: get_table_sample(conn, "any_table", 10),
+        lambda conn: list_tables(conn),
+        lambda conn: execute_sql_query(conn, "SELECT 1"),
+        lambda conn: _drain_stream(conn, "SELECT 1"),
+    ],
+    ids=[
+        "get_db_schema",
+        "get_table_sample",
+        "list_tables",
+        "execute_sql_query",
+        "stream_sql_query",
+    ],
+)
+async def test_invalid_connection_raises(operation):
+    """Test a missing connection (e.g., None) raises DatabaseConnectionError."""
+    with pytest.raises(
+        DatabaseConnectionError, match="Provided database connection is invalid"
+    ):
+        await operation(None)
@@ -237,6 +237,50 @@ async def test_get_table_sample_integration_invalid_input(mock_db_op_get_sample,
     mock_db_op_get_sample.assert_called_once_with(ANY, table_name, limit)
 
 
+@pytest.mark.asyncio
+@patch('vast_mcp_server.vast_integration.db_ops.get_table_sample_arrow')
+async def test_get_table_sample_integration_success_arrow(
+    mock_db_op_get_sample_arrow, client, mocker
+):
+    pa = pytest.importorskip("pyarrow")
+    mocker.patch.object(app_config, 'VAST_ACCESS_KEY', 'config_access_key')
+    mocker.patch.object(app_config, 'VAST_SECRET_KEY', 'config_secret_key')
+    table_name = "users"
+    limit = 5
+    arrow_table = pa.table({'id': [1, 2], 'name': ['A', 'B']})
+    mock_db_op_get_sample_arrow.return_value = arrow_table
+    response = await client.get(f"/vast/tables/{table_name}?limit={limit}&format=arrow")
+    assert response.status_code == 200
+    assert response.headers['content-type'] == "application/vnd.apache.arrow.stream"
+    assert pa.ipc.open_stream(response.content).read_all().equals(arrow_table)
+    mock_db_op_get_sample_arrow.assert_called_once_with(ANY, table_name, limit)
+
+
+@pytest.mark.asyncio
+@patch('vast_mcp_server.vast_integration.db_ops.get_table_sample')
+@patch('vast_mcp_server.vast_integration.db_ops.stream_table_sample')
+async def test_get_table_sample_integration_streams_when_enabled(
+    mock_db_op_stream_sample, mock_db_op_get_sample, client, mocker
+):
+    mocker.patch.object(app_config, 'VAST_ACCESS_KEY', 'config_access_key')
+    mocker.patch.object(app_config, 'VAST_SECRET_KEY', 'config_secret_key')
+    mocker.patch.object(app_config, 'STREAM_RESULTS', True)
+    table_name = "users"
+    limit = 2
+
+    async def batches(conn, name, sample_limit):
+        yield {'columns': ['id', 'name'], 'rows': [(1, 'A')]}
+        yield {'columns': ['id', 'name'], 'rows': [(2, 'B')]}
+    mock_db_op_stream_sample.side_effect = batches
+
+    response = await client.get(f"/vast/tables/{table_name}?limit={limit}&format=csv")
+    assert response.status_code == 200
+    assert response.headers['content-type'] == "text/csv; charset=utf-8"
+    assert response.text == "id,name\r\n1,A\r\n2,B\r\n"
+    mock_db_op_stream_sample.assert_called_once_with(ANY, table_name, limit)
+    mock_db_op_get_sample.assert_not_called()
+
+
 # --- Integration Tests for resources/metadata.py ---
 
 @pytest.mark.asyncio
@@ -256,6 +300,24 @@ async def test_get_table_metadata_success(mock_db_op_get_metadata, client, mocke
     assert response.json() == expected_metadata
     mock_db_op_get_metadata.assert_called_once_with(ANY, table_name)
 
+@pytest.mark.asyncio
+@patch('vast_mcp_server.vast_integration.db_ops.get_table_metadata')
+async def test_get_table_metadata_wide_integer_and_non_ascii(
+    mock_db_op_get_metadata, client, mocker
+):
+    """Values orjson cannot encode (ints over 64 bits) still serialize unchanged."""
+    mocker.patch.object(app_config, 'VAST_ACCESS_KEY', 'config_access_key')
+    mocker.patch.object(app_config, 'VAST_SECRET_KEY', 'config_secret_key')
+    table_name = "test_table"
+    expected_metadata = {
+        "table_name": table_name,
+        "columns": [{"name": "année", "type": "DECIMAL(38,0)", "max": 2**70}]
+    }
+    mock_db_op_get_metadata.return_value = expected_metadata
+    response = await client.get(f"/vast/metadata/tables/{table_name}")
+    assert response.status_code == 200
+    assert response.json() == expected_metadata
+
 @pytest.mark.asyncio
 async def test_get_table_metadata_mismatched_credentials(client, mocker):
     mocker.patch.object(app_config, 'VAST_ACCESS_KEY', 'actual_key')
@@ -177,6 +177,147 @@ async def test_vast_sql_query_handler_format_success_json(mock_execute_sql, mock
     assert result == expected_json_str
     mock_execute_sql.assert_called_once_with(mock_db_conn, sql)
 
+@pytest.mark.parametrize(
+    "format_type, expected",
+    [
+        ("csv", "id,name\r\n1,Alice\r\n2,Bob\r\n"),
+        (
+            "json",
+            json.dumps(
+                [{'id': 1, 'name': 'Alice'}, {'id': 2, 'name': 'Bob'}], indent=2
+            ),
+        ),
+        (
+            "columnar",
+            json.dumps(
+                {'columns': ['id', 'name'], 'rows': [[1, 'Alice'], [2, 'Bob']]},
+                indent=2,
+            ),
+        ),
+    ],
+)
+@patch('vast_mcp_server.vast_integration.db_ops.execute_sql_query')
+async def test_vast_sql_query_handler_formats_columnar_result(
+    mock_execute_sql, mocker, format_type, expected
+):
+    """Test the columnar result from db_ops is rendered in each supported format."""
+    mocker.patch.object(
+        app_config, 'VAST_ACCESS_KEY', CONFIG_MATCHING_HEADERS['X-Vast-Access-Key']
+    )
+    mocker.patch.object(
+        app_config, 'VAST_SECRET_KEY', CONFIG_MATCHING_HEADERS['X-Vast-Secret-Key']
+    )
+    mock_req, mock_ctx, mock_db_conn = _get_mock_context_and_db_conn()
+    sql = "SELECT id, name FROM users"
+    mock_execute_sql.return_value = {
+        'columns': ['id', 'name'],
+        'rows': [(1, 'Alice'), (2, 'Bob')],
+    }
+
+    result = await query.vast_sql_query(
+        request=mock_req,
+        sql=sql,
+        format=format_type,
+        headers=CONFIG_MATCHING_HEADERS,
+        ctx=mock_ctx,
+    )
+
+    assert result == expected
+    mock_execute_sql.assert_called_once_with(mock_db_conn, sql)
+
+@pytest.mark.parametrize(
+    "format_type, expected",
+    [
+        ("csv", "id,name\r\n1,Alice\r\n2,Bob\r\n"),
+        (
+            "json",
+            json.dumps(
+                [{'id': 1, 'name': 'Alice'}, {'id': 2, 'name': 'Bob'}], indent=2
+            ),
+        ),
+        (
+            "columnar",
+            json.dumps(
+                {'columns': ['id', 'name'], 'rows': [[1, 'Alice'], [2, 'Bob']]},
+                indent=2,
+            ),
+        ),
+    ],
+)
+@patch('vast_mcp_server.vast_integration.db_ops.execute_sql_query')
+@patch('vast_mcp_server.vast_integration.db_ops.stream_sql_query')
+async def test_vast_sql_query_handler_streams_batches(
+    mock_stream_sql, mock_execute_sql, mocker, format_type, expected
+):
+    """Test MCP_STREAM_RESULTS formats streamed batches like a materialised result."""
+    mocker.patch.object(
+        app_config, 'VAST_ACCESS_KEY', CONFIG_MATCHING_HEADERS['X-Vast-Access-Key']
+    )
+    mocker.patch.object(
+        app_config, 'VAST_SECRET_KEY', CONFIG_MATCHING_HEADERS['X-Vast-Secret-Key']
+    )
+    mocker.patch.object(app_config, 'STREAM_RESULTS', True)
+    mock_req, mock_ctx, mock_db_conn = _get_mock_context_and_db_conn()
+    sql = "SELECT id, name FROM users"
+
+    async def batches(conn, query_sql):
+        yield {'columns': ['id', 'name'], 'rows': [(1, 'Alice')]}
+        yield {'columns': ['id', 'name'], 'rows': [(2, 'Bob')]}
+    mock_stream_sql.side_effect = batches
+
+    result = await query.vast_sql_query(
+        request=mock_req,
+        sql=sql,
+        format=format_type,
+        headers=CONFIG_MATCHING_HEADERS,
+        ctx=mock_ctx,
+    )
+
+    assert result == expected
+    mock_stream_sql.assert_called_once_with(mock_db_conn, sql)
+    mock_execute_sql.assert_not_called()
+
+@pytest.mark.parametrize("format_type", ["csv", "json", "columnar"])
+@pytest.mark.parametrize(
+    "streamed_items, expected",
+    [
+        ([], "-- Query executed successfully, but returned no rows. --"),
+        (
+            ["-- Query executed, but it was not a type that returns rows. --"],
+            "-- Query executed, but it was not a type that returns rows. --",
+        ),
+    ],
+    ids=["empty-select", "non-select"],
+)
+@patch('vast_mcp_server.vast_integration.db_ops.stream_sql_query')
+async def test_vast_sql_query_handler_streams_empty_result_like_buffered(
+    mock_stream_sql, mocker, streamed_items, expected, format_type
+):
+    """Test an empty stream returns the buffered path's message in every format."""
+    mocker.patch.object(
+        app_config, 'VAST_ACCESS_KEY', CONFIG_MATCHING_HEADERS['X-Vast-Access-Key']
+    )
+    mocker.patch.object(
+        app_config, 'VAST_SECRET_KEY', CONFIG_MATCHING_HEADERS['X-Vast-Secret-Key']
+    )
+    mocker.patch.object(app_config, 'STREAM_RESULTS', True)
+    mock_req, mock_ctx, _ = _get_mock_context_and_db_conn()
+
+    async def items(conn, query_sql):
+        for item in streamed_items:
+            yield item
+    mock_stream_sql.side_effect = items
+
+    result = await query.vast_sql_query(
+        request=mock_req,
+        sql="SELECT 1",
+        format=format_type,
+        headers=CONFIG_MATCHING_HEADERS,
+        ctx=mock_ctx,
+    )
+
+    assert result == expected
+
 @patch('vast_mcp_server.vast_integration.db_ops.execute_sql_query')
 async def test_vast_sql_query_handler_format_invalid_defaults_csv(mock_execute_sql, mocker):
     mocker.patch.object(app_config, 'VAST_ACCESS_KEY', CONFIG_MATCHING_HEADERS['X-Vast-Access-Key'])